@@ -5,7 +5,22 @@ import chess.pgn
 import time
 import random
 import json
+import io
+import re
+import argparse
+import multiprocessing
+import multiprocessing.util
+import math
+import itertools
+import mmap
+import struct
+import hashlib
 import queue
+import threading
+import asyncio
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime
 
 try:
@@ -20,6 +35,12 @@ try:
 except ImportError:
     HAS_POLYGLOT = False
 
+try:
+    import chess.syzygy
+    HAS_SYZYGY = True
+except ImportError:
+    HAS_SYZYGY = False
+
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import *
 from PyQt5.QtCore import *
@@ -27,10 +48,30 @@ from PyQt5.QtCore import *
 # ================= CONFIG =================
 BOARD_SIZE = 600
 SQ = BOARD_SIZE // 8
+
+# Профили за сила на двигателя: ключ -> (параметри на chess.engine.Limit, етикет bg, етикет en).
+# Празен профил означава игра по часовник; комбинираните спират при първото изпълнено условие.
+SEARCH_PROFILES = {
+    "time_based": ({}, "Въз основа на време (TC)", "Time based (TC)"),
+    "depth_10": ({"depth": 10}, "Дълбочина 10 (Бързо)", "Depth 10 (Fast)"),
+    "depth_15": ({"depth": 15}, "Дълбочина 15 (Стандарт)", "Depth 15 (Standard)"),
+    "depth_20": ({"depth": 20}, "Дълбочина 20 (Силно)", "Depth 20 (Strong)"),
+    "nodes_100000": ({"nodes": 100000}, "Позиции 100000", "Nodes 100000"),
+    "nodes_1000000": ({"nodes": 1000000}, "Позиции 1000000", "Nodes 1000000"),
+    "movetime_1": ({"time": 1.0}, "1 секунда на ход", "1 second per move"),
+    "movetime_5": ({"time": 5.0}, "5 секунди на ход", "5 seconds per move"),
+    "depth_20_movetime_5": ({"depth": 20, "time": 5.0}, "Дълбочина 20 или 5 с", "Depth 20 or 5 s"),
+    "nodes_1000000_movetime_2": ({"nodes": 1000000, "time": 2.0}, "1M позиции или 2 с", "1M nodes or 2 s"),
+    "mate_5": ({"mate": 5, "time": 10.0}, "Търсене на мат в 5 (до 10 с)", "Mate in 5 search (max 10 s)"),
+    "custom": (None, "Потребителски (custom_search_limit)", "Custom (custom_search_limit)"),
+}
+SEARCH_LIMIT_KEYS = ("depth", "nodes", "time", "mate")
 # =========================================
 
 class ConsoleWidget(QWidget):
     """Интерактивна конзола за контрол на програмата"""
+    # Съобщения от нишката на мача към конзолата (текст, тип)
+    match_message = pyqtSignal(str, str)
     
     def __init__(self, main_app):
         super().__init__()
@@ -38,6 +79,9 @@ class ConsoleWidget(QWidget):
         self.history = []
         self.history_index = 0
         self.command_queue = queue.Queue()
+        self.match = None
+        self.match_running = False
+        self.match_message.connect(self.print_text)
         
         self.init_ui()
         self.setup_commands()
@@ -176,7 +220,7 @@ class ConsoleWidget(QWidget):
                 'engine': {
                     'func': self.cmd_engine,
                     'desc': 'Контрол на двигателите',
-                    'usage': 'engine [start|stop|status|restart]'
+                    'usage': 'engine [start|stop|status|restart|options [1|2|a]|set [1|2|a] <опция> <стойност>]'
                 },
                 'mode': {
                     'func': self.cmd_mode,
@@ -257,6 +301,11 @@ class ConsoleWidget(QWidget):
                     'func': self.cmd_pgn,
                     'desc': 'Работа с PGN бази данни',
                     'usage': 'pgn [open|info|games|next|prev]'
+                },
+                'match': {
+                    'func': self.cmd_match,
+                    'desc': 'Мач двигател 1 срещу двигател 2 във фонов режим с Elo/LOS/SPRT',
+                    'usage': 'match <партии> [tc <[ходове/]сек+инкр>] [sprt <elo0> <elo1>] | match stop | match status'
                 }
             }
         else:
@@ -319,7 +368,7 @@ class ConsoleWidget(QWidget):
                 'engine': {
                     'func': self.cmd_engine,
                     'desc': 'Controls the engines',
-                    'usage': 'engine [start|stop|status|restart]'
+                    'usage': 'engine [start|stop|status|restart|options [1|2|a]|set [1|2|a] <option> <value>]'
                 },
                 'mode': {
                     'func': self.cmd_mode,
@@ -400,6 +449,11 @@ class ConsoleWidget(QWidget):
                     'func': self.cmd_pgn,
                     'desc': 'Works with PGN databases',
                     'usage': 'pgn [open|info|games|next|prev]'
+                },
+                'match': {
+                    'func': self.cmd_match,
+                    'desc': 'Background engine 1 vs engine 2 match with Elo/LOS/SPRT',
+                    'usage': 'match <games> [tc <[moves/]sec+inc>] [sprt <elo0> <elo1>] | match stop | match status'
                 }
             }
     
@@ -848,11 +902,52 @@ Mode: {'Engine vs Engine' if self.app.is_engine_vs_engine else 'Human vs Engine'
                 status_msg = f"Engine status: {engine1_status}"
             self.print_text(status_msg, "info")
         elif subcmd == "restart":
-            self.app.restart_engine()
+            self.app.restart_engine(force=True)
             success_msg = "Двигателите са рестартирани" if language == "bg" else "Engines restarted"
             self.print_text(success_msg, "success")
+        elif subcmd in ("options", "set"):
+            rest = args[1:]
+            eng_num = 1
+            if rest and rest[0].lower() in ("1", "2", "a", "analysis"):
+                eng_num = int(rest[0]) if rest[0].isdigit() else "analysis"
+                rest = rest[1:]
+            engine = getattr(self.app, self.app.ENGINE_SLOTS[eng_num][0])
+            if not engine:
+                self.print_text("Двигателят не е зареден" if language == "bg" else "Engine not loaded", "error")
+                return
+            
+            if subcmd == "options":
+                lines = []
+                current = self.app.engine_option_values(eng_num)
+                for option in engine.options.values():
+                    if option.is_managed():
+                        continue
+                    value = current.get(option.name, option.default)
+                    bounds = f" [{option.min}..{option.max}]" if option.type == "spin" else ""
+                    choices = f" {{{', '.join(option.var)}}}" if option.var else ""
+                    lines.append(f"{option.name} ({option.type}{bounds}{choices}) = {value}")
+                self.print_text("\n".join(lines), "system")
+                return
+            
+            # Името на опцията може да съдържа интервали (напр. "Move Overhead")
+            joined = " ".join(rest)
+            option_name = None
+            for name in sorted(engine.options, key=len, reverse=True):
+                if joined.lower() == name.lower() or joined.lower().startswith(name.lower() + " "):
+                    option_name = name
+                    break
+            if option_name is None:
+                usage = "Използване: engine set [1|2|a] <опция> <стойност>" if language == "bg" else "Usage: engine set [1|2|a] <option> <value>"
+                self.print_text(usage, "error")
+                return
+            value = joined[len(option_name):].strip() or None
+            try:
+                value = self.app.set_engine_option(eng_num, option_name, value)
+                self.print_text(f"{option_name} = {value}", "success")
+            except ValueError as e:
+                self.print_text(str(e), "error")
         else:
-            error_msg = "Неразпозната подкоманда. Възможности: start, stop, status, restart" if language == "bg" else "Unknown subcommand. Options: start, stop, status, restart"
+            error_msg = "Неразпозната подкоманда. Възможности: start, stop, status, restart, options, set" if language == "bg" else "Unknown subcommand. Options: start, stop, status, restart, options, set"
             self.print_text(error_msg, "error")
     
     def cmd_mode(self, args):
@@ -1299,7 +1394,7 @@ UCI notation: {uci}
                 """
             self.print_text(hint_text, "info")
         else:
-            if self.app.analysis_thread and self.app.analysis_thread.isRunning():
+            if self.app.analysis_token is not None:
                 info_msg = "Двигателят все още анализира. Изчакайте..." if language == "bg" else "Engine is still analyzing. Wait..."
                 self.print_text(info_msg, "info")
             else:
@@ -1462,11 +1557,12 @@ Status:
                 if len(self.app.pgn_games) > 0:
                     count_msg = f"Брой партии в базата: {len(self.app.pgn_games)}" if language == "bg" else f"Games in database: {len(self.app.pgn_games)}"
                     self.print_text(count_msg, "info")
-                    for i, game in enumerate(self.app.pgn_games[:10]):
-                        event = game.headers.get("Event", "N/A")
-                        white = game.headers.get("White", "N/A")
-                        black = game.headers.get("Black", "N/A")
-                        result = game.headers.get("Result", "*")
+                    for i in range(min(10, len(self.app.pgn_games))):
+                        headers = self.app.pgn_games.headers(i)
+                        event = headers.get("Event", "N/A")
+                        white = headers.get("White", "N/A")
+                        black = headers.get("Black", "N/A")
+                        result = headers.get("Result", "*")
                         game_info = f"{i+1}. {white} vs {black} ({result}) - {event}"
                         self.print_text(game_info)
                 else:
@@ -1505,129 +1601,1759 @@ Status:
             error_msg = "Неразпозната подкоманда. Възможности: open, info, games, next, prev" if language == "bg" else "Unknown subcommand. Options: open, info, games, next, prev"
             self.print_text(error_msg, "error")
 
+    def cmd_match(self, args):
+        """Мач между двигател 1 и двигател 2 без GUI; спира сам при приключил SPRT"""
+        language = self.app.language
+        running = self.match_running
+        
+        if not args or args[0].lower() == "status":
+            if self.match is None:
+                self.print_text("Няма мач" if language == "bg" else "No match", "info")
+            else:
+                self.print_text(self.match.statistics.summary(), "system")
+            return
+        if args[0].lower() == "stop":
+            if running:
+                self.match.stop()
+                self.print_text("Мачът спира след текущите ходове" if language == "bg" else "Match stops after the current moves", "warning")
+            return
+        if running:
+            self.print_text("Вече тече мач (match stop)" if language == "bg" else "A match is already running (match stop)", "warning")
+            return
+        
+        time_control = (float(self.app.time_control), float(self.app.increment),
+                        self.app.settings.get("moves_per_session", 0))
+        elo0 = elo1 = None
+        try:
+            games = int(args[0])
+            if games < 1:
+                raise ValueError(args[0])
+            rest = [arg.lower() for arg in args[1:]]
+            while rest:
+                keyword = rest.pop(0)
+                if keyword == "tc" and rest:
+                    time_control = parse_time_control(rest.pop(0))
+                elif keyword == "sprt" and len(rest) >= 2:
+                    elo0, elo1 = float(rest.pop(0)), float(rest.pop(0))
+                else:
+                    raise ValueError(keyword)
+        except ValueError:
+            usage = f"Употреба: {self.commands['match']['usage']}" if language == "bg" else f"Usage: {self.commands['match']['usage']}"
+            self.print_text(usage, "error")
+            return
+        
+        # Всяко откриване от набора се играе с двата цвята; без набор детерминираните
+        # двигатели повтарят една и съща партия и SPRT няма смисъл
+        suite = self.app.opening_suite
+        if suite is not None:
+            openings = [suite.positions[suite.position_index(2 * pair)] for pair in range((games + 1) // 2)]
+            rounds = 1
+        elif elo0 is not None:
+            self.print_text("SPRT изисква набор от дебюти (Двигател → Набор от дебюти)" if language == "bg"
+                            else "SPRT needs an opening suite (Engine → Opening Suite)", "error")
+            return
+        else:
+            openings = None
+            rounds = (games + 1) // 2
+            self.print_text("Без набор от дебюти всички партии започват от началната позиция" if language == "bg"
+                            else "Without an opening suite every game starts from the initial position", "warning")
+        
+        engines = []
+        for eng_num in (1, 2):
+            path, options = self.app.engine_slot_config(eng_num)
+            if not path or not os.path.exists(path):
+                raise ValueError(f"Двигател {eng_num} не е зададен" if language == "bg" else f"Engine {eng_num} is not set")
+            engine = getattr(self.app, self.app.ENGINE_SLOTS[eng_num][0])
+            name = engine.id.get("name", "") if engine is not None else ""
+            engines.append((unique_engine_name(name or os.path.basename(path), engines), path, options))
+        
+        threads = max(options.get("Threads", 1) for _, _, options in engines)
+        statistics = MatchStatistics(elo0, elo1)
+        self.match = Tournament(engines, rounds=rounds, time_control=time_control, openings=openings,
+                                concurrency=max(1, (os.cpu_count() or 1) // max(1, threads)),
+                                statistics=statistics, adjudication=dict(self.app.settings.current))
+        match = self.match
+        
+        def report(record):
+            self.match_message.emit(f"{record['white']} - {record['black']}  {record['result']}  ({record['termination']})", "normal")
+            self.match_message.emit(statistics.summary(), "system")
+        
+        def run():
+            try:
+                match.run(report)
+                verdict = statistics.sprt_result()
+                done = f"Мачът приключи{': ' + verdict if verdict else ''}" if language == "bg" else f"Match finished{': ' + verdict if verdict else ''}"
+                self.match_message.emit(done, "success")
+            except Exception as e:
+                self.match_message.emit(f"Грешка в мача: {e}" if language == "bg" else f"Match error: {e}", "error")
+            finally:
+                self.match_running = False
+        
+        self.match_running = True
+        threading.Thread(target=run, daemon=True).start()
+        self.print_text(f"Мач: {engines[0][0]} - {engines[1][0]}, {games} партии" if language == "bg"
+                        else f"Match: {engines[0][0]} - {engines[1][0]}, {games} games", "success")
+
 
-class EngineThread(QThread):
-    info = pyqtSignal(object)
-    bestmove = pyqtSignal(object)
-    error = pyqtSignal(str)
+class CancelToken:
+    """Токен за отмяна на команда, изпратена към двигателя"""
 
-    def __init__(self, engine, board, time_control, increment=0, is_analysis=False):
+    def __init__(self):
+        self.cancelled = False
+        # Ponder: човекът изигра предсказания ход (изпратен е ponderhit)
+        self.ponderhit = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class EngineCommand:
+    """Команда в опашката на EngineWorker"""
+
+    def __init__(self, kind, board=None, limit=None, options=None, game=None, multipv=None):
+        self.kind = kind
+        self.board = board.copy() if board is not None else None
+        self.limit = limit
+        self.options = options
+        self.game = game
+        self.multipv = multipv
+        self.token = CancelToken()
+
+
+class InfoAggregator:
+    """Слива info съобщенията от двигателя в един snapshot, подаван най-много update_hz пъти в секунда"""
+
+    def __init__(self, update_hz=30):
+        self.interval = 1.0 / update_hz if update_hz and update_hz > 0 else 0.0
+        self.pending = None
+        self.last_pv = None
+        self.lines = {}
+        self.last_emit = 0.0
+
+    def add(self, info):
+        # По-новите полета заменят старите; редове без pv (currmove и т.н.) пазят последния PV.
+        # При MultiPV основният snapshot следи линия 1, а всички линии се пазят по номер.
+        if self.pending is None:
+            self.pending = {}
+        line = info.get("multipv", 1)
+        self.lines.setdefault(line, {}).update(info)
+        if line != 1:
+            return
+        self.pending.update(info)
+        if "pv" in info:
+            self.last_pv = info["pv"]
+        elif self.last_pv is not None:
+            self.pending["pv"] = self.last_pv
+
+    def time_until_due(self):
+        return max(0.0, self.last_emit + self.interval - time.monotonic())
+
+    def take(self):
+        snapshot = self.pending
+        if "pv" not in snapshot and self.last_pv is not None:
+            snapshot["pv"] = self.last_pv
+        if len(self.lines) > 1:
+            snapshot["lines"] = {line: dict(info) for line, info in self.lines.items()}
+        self.pending = None
+        self.last_emit = time.monotonic()
+        return snapshot
+
+
+class EngineWorker(QThread):
+    """Дълготраен тред за един процес на двигател, управляван чрез опашка от команди"""
+    info = pyqtSignal(object, object)
+    bestmove = pyqtSignal(object, object, object)
+    error = pyqtSignal(object, str)
+    # Процесът е паднал или не отговаря (изход, таймаут на isready)
+    failed = pyqtSignal(str)
+
+    def __init__(self, engine, update_hz=30):
         super().__init__()
         self.engine = engine
-        self.board = board.copy()
-        self.time_control = time_control
-        self.increment = increment
-        self.is_analysis = is_analysis
-        self._stop_requested = False
+        self.update_hz = update_hz
+        self.commands = queue.Queue()
+        self._lock = threading.Lock()
+        self._active_token = None
+        self._active_analysis = None
+        # Следене на здравето: последна активност на двигателя и дали изпълнява команда
+        self.last_activity = time.monotonic()
+        self.busy = False
+        self._running_command = None
+        # Време на изпратения isready по време на безкрайно търсене (None = няма чакащ readyok)
+        self.probe_sent = None
+        # Всеки ред от двигателя (и readyok на пробата) е знак, че е жив
+        engine.protocol.line_received = self._line_received
+        # analysis() на python-chess няма go ponder, затова за ponder командата
+        # флагът се добавя към go реда, който тя изпраща
+        self._go_ponder = False
+        go = engine.protocol._go
+        engine.protocol._go = lambda limit, **kwargs: go(limit, **dict(kwargs, ponder=kwargs.get("ponder") or self._go_ponder))
+
+    # ================= API (извиква се от GUI нишката) =================
+
+    def analyse(self, board, game=None, multipv=None, limit=None):
+        """Анализ на позицията (безкраен, ако няма limit; по желание с MultiPV). Връща токен за отмяна."""
+        return self._submit(EngineCommand("analyse", board, limit or chess.engine.Limit(), game=game, multipv=multipv))
+
+    def search(self, board, limit, game=None):
+        """Търсене на ход с ограничение. Връща токен за отмяна.
+        Нова стойност на game кара двигателя да получи ucinewgame."""
+        return self._submit(EngineCommand("search", board, limit, game=game))
+
+    def ponder(self, board, limit, game=None):
+        """go ponder в очакваната позиция след предсказания ход на човека (limit са часовниците).
+        Ход се връща само след ponderhit(). Връща токен за отмяна."""
+        return self._submit(EngineCommand("ponder", board, limit, game=game))
+
+    def ponderhit(self, token):
+        """Човекът изигра предсказания ход: двигателят продължава търсенето със собственото
+        си разпределение на времето. Ако go ponder още не е изпратен, търсенето тръгва като обикновено"""
+        with self._lock:
+            token.ponderhit = True
+            if token is self._active_token:
+                self._send_ponderhit()
+
+    def _send_ponderhit(self):
+        protocol = self.engine.protocol
+        protocol.loop.call_soon_threadsafe(protocol.send_line, "ponderhit")
+
+    def configure(self, options):
+        return self._submit(EngineCommand("configure", options=dict(options)))
+
+    def ping(self):
+        """isready/readyok проверка; при таймаут се излъчва failed"""
+        return self._submit(EngineCommand("ping"))
+
+    def is_idle(self):
+        return not self.busy and self.commands.empty()
+
+    def is_hung(self, timeout):
+        """Зает е и двигателят не отговаря повече от timeout секунди. При безкраен анализ/ponder
+        мълчанието е нормално (напр. намерен мат), затова там се чака само readyok на пробата"""
+        if not self.busy:
+            return False
+        now = time.monotonic()
+        if self.infinite_search():
+            return self.probe_sent is not None and now - self.probe_sent > timeout
+        return now - self.last_activity > timeout
+
+    def infinite_search(self):
+        command = self._running_command
+        if command is None or command.kind not in ("analyse", "ponder"):
+            return False
+        if command.kind == "ponder":
+            # go ponder не свършва до ponderhit/stop
+            return not command.token.ponderhit
+        limit = command.limit
+        return all(value is None for value in (limit.time, limit.depth, limit.nodes, limit.mate,
+                                               limit.white_clock, limit.black_clock))
+
+    def probe(self, interval):
+        """isready по време на безкрайно търсене, ако двигателят мълчи повече от interval секунди.
+        Редът се праща направо, защото нова команда на python-chess би прекъснала анализа"""
+        if not self.infinite_search() or self.probe_sent is not None:
+            return
+        if time.monotonic() - self.last_activity < interval:
+            return
+        self.probe_sent = time.monotonic()
+        protocol = self.engine.protocol
+        protocol.loop.call_soon_threadsafe(protocol.send_line, "isready")
+
+    def _line_received(self, line):
+        # Извиква се в нишката на python-chess
+        self.last_activity = time.monotonic()
+        if line.strip() == "readyok":
+            self.probe_sent = None
+
+    def stop(self, token=None):
+        """Отменя командата с дадения токен (или всички), без да блокира"""
+        if token is not None:
+            token.cancel()
+        else:
+            self._cancel_pending()
+        with self._lock:
+            if self._active_analysis is not None and (token is None or token is self._active_token):
+                if self._active_token is not None:
+                    self._active_token.cancel()
+                try:
+                    self._active_analysis.stop()
+                except Exception:
+                    pass
+
+    def shutdown(self):
+        """Спира текущата работа и затваря двигателя в нишката на worker-а"""
+        self.stop()
+        self.commands.put(EngineCommand("quit"))
+
+    def _submit(self, command):
+        self.commands.put(command)
+        return command.token
+
+    def _cancel_pending(self):
+        pending = []
+        while True:
+            try:
+                pending.append(self.commands.get_nowait())
+            except queue.Empty:
+                break
+        for command in pending:
+            if command.kind in ("analyse", "search", "ponder"):
+                command.token.cancel()
+            else:
+                self.commands.put(command)
+
+    # ================= Нишка на worker-а =================
+
+    def run(self):
+        if not HAS_ENGINE:
+            return
+        while True:
+            command = self.commands.get()
+            if command.kind == "quit":
+                break
+            if command.token.cancelled:
+                continue
+            self.busy = True
+            self._running_command = command
+            self.last_activity = time.monotonic()
+            try:
+                if command.kind == "configure":
+                    self.engine.configure(command.options)
+                elif command.kind == "ping":
+                    self.engine.ping()
+                else:
+                    self._run_search(command)
+            except chess.engine.EngineTerminatedError:
+                if not command.token.cancelled:
+                    self.error.emit(command.token, "Engine terminated")
+                self.failed.emit("Engine terminated")
+            except (asyncio.TimeoutError, TimeoutError):
+                self.failed.emit("Engine timeout")
+            except Exception:
+                if not command.token.cancelled:
+                    self.error.emit(command.token, "Engine error")
+            finally:
+                self.busy = False
+                self._running_command = None
+                self.probe_sent = None
+                self.last_activity = time.monotonic()
+
+        try:
+            self.engine.quit()
+        except Exception:
+            pass
+
+    def _run_search(self, command):
+        token = command.token
+        if command.kind == "search" and command.board.is_game_over():
+            return
+
+        pondering = command.kind == "ponder" and not token.ponderhit
+        self._go_ponder = pondering
+        try:
+            analysis = self.engine.analysis(command.board, command.limit, multipv=command.multipv,
+                                            game=command.game)
+        finally:
+            self._go_ponder = False
+        with analysis:
+            with self._lock:
+                self._active_token = token
+                self._active_analysis = analysis
+                if pondering and token.ponderhit:
+                    self._send_ponderhit()
+            aggregator = InfoAggregator(self.update_hz)
+            try:
+                if token.cancelled:
+                    analysis.stop()
+                for info in analysis:
+                    self.last_activity = time.monotonic()
+                    if token.cancelled:
+                        analysis.stop()
+                        break
+                    aggregator.add(info)
+                    # Докато има чакащи редове те се сливат; иначе snapshot-ът се подава
+                    # щом изтече интервалът, така че последното състояние не остава задържано
+                    delay = aggregator.time_until_due()
+                    if delay > 0 and not analysis.would_block():
+                        continue
+                    if delay > 0:
+                        time.sleep(delay)
+                    if not token.cancelled:
+                        self.info.emit(token, aggregator.take())
+                result = analysis.wait()
+                if aggregator.pending and not token.cancelled:
+                    self.info.emit(token, aggregator.take())
+            finally:
+                with self._lock:
+                    self._active_token = None
+                    self._active_analysis = None
+
+        wants_move = command.kind == "search" or (command.kind == "ponder" and token.ponderhit)
+        if wants_move and not token.cancelled and result and result.move:
+            ponder = result.ponder
+            pv = aggregator.last_pv
+            if ponder is None and pv and len(pv) > 1 and pv[0] == result.move:
+                ponder = pv[1]
+            self.bestmove.emit(token, result.move, ponder)
+
+
+class EngineSpawnThread(QThread):
+    """Стартира процес на двигател във фонов режим (при рестарт след срив)"""
+    spawned = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+    def __init__(self, path, options):
+        super().__init__()
+        self.path = path
+        self.options = options
+
+    def run(self):
+        try:
+            engine = chess.engine.SimpleEngine.popen_uci(self.path)
+            engine.configure({name: value for name, value in self.options.items() if name in engine.options})
+        except Exception as e:
+            self.error.emit(str(e))
+            return
+        self.spawned.emit(engine)
+
+
+class TimeManager:
+    """Подава реалното състояние на часовниците към двигателя (wtime/btime/winc/binc/movestogo)
+    и приспада измереното забавяне на GUI/IPC"""
+
+    def __init__(self, overhead=0.05, alpha=0.3, safety=2.0):
+        self.overhead = overhead
+        self.alpha = alpha
+        self.safety = safety
+
+    def remaining_moves(self, board, moves_per_session):
+        """Ходове до края на сесията за страната на ход (None при sudden death/инкремент)"""
+        if not moves_per_session:
+            return None
+        moves_made = board.fullmove_number - 1
+        return moves_per_session - (moves_made % moves_per_session)
+
+    def session_completed(self, board, color, moves_per_session):
+        """Дали току-що изиграният ход на color завършва сесия (извиква се след push)"""
+        if not moves_per_session:
+            return False
+        moves_made = board.fullmove_number if color == chess.WHITE else board.fullmove_number - 1
+        return moves_made > 0 and moves_made % moves_per_session == 0
+
+    def reserve(self):
+        return self.overhead * self.safety
+
+    def build_limit(self, board, white_time, black_time, increment, moves_per_session=0):
+        """Limit с часовниците; от собственото време се приспада резерв за забавянето"""
+        if board.turn == chess.WHITE:
+            white_time = max(0.01, white_time - self.reserve())
+        else:
+            black_time = max(0.01, black_time - self.reserve())
+        return chess.engine.Limit(white_clock=white_time, black_clock=black_time,
+                                  white_inc=increment, black_inc=increment,
+                                  remaining_moves=self.remaining_moves(board, moves_per_session))
+
+    def record_overhead(self, wall_time, engine_time):
+        """Разлика между времето от заявката до bestmove и отчетеното от двигателя време (EMA)"""
+        measured = max(0.0, wall_time - engine_time)
+        self.overhead += self.alpha * (measured - self.overhead)
+
+
+class EvalCache:
+    """Кеш на оценките по Zobrist хеш: LRU в паметта и по желание SQLite на диска.
+    Пази оценка (от гледна точка на белите), дълбочина, PV и името на двигателя."""
+
+    def __init__(self, max_entries=50000, db_path=None):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.dirty = set()
+        self.db = None
+        if db_path:
+            try:
+                self.db = sqlite3.connect(db_path)
+                self.db.execute("CREATE TABLE IF NOT EXISTS evals (key TEXT PRIMARY KEY, kind TEXT, value INTEGER, "
+                                "depth INTEGER, pv TEXT, engine TEXT)")
+            except sqlite3.Error:
+                self.db = None
+
+    @staticmethod
+    def key(board):
+        if HAS_POLYGLOT:
+            return f"{chess.polyglot.zobrist_hash(board):016x}"
+        return board.epd()
+
+    def get(self, board):
+        """Записът за позицията (или None): score (PovScore), depth, pv (ходове), engine"""
+        key = self.key(board)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        elif self.db is not None:
+            try:
+                row = self.db.execute("SELECT kind, value, depth, pv, engine FROM evals WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error:
+                row = None
+            if row is None:
+                return None
+            entry = row
+            self._remember(key, entry)
+        if entry is None:
+            return None
+        kind, value, depth, pv, engine = entry
+        score = chess.engine.Cp(value) if kind == "cp" else chess.engine.Mate(value)
+        moves = [chess.Move.from_uci(uci) for uci in pv.split()] if pv else []
+        return {"score": chess.engine.PovScore(score, chess.WHITE), "depth": depth, "pv": moves, "engine": engine}
+
+    def put(self, board, info, engine_name=""):
+        """Запазва info, ако е по-дълбоко от наличния запис. Връща True при промяна."""
+        if "score" not in info or "depth" not in info:
+            return False
+        key = self.key(board)
+        current = self.entries.get(key)
+        if current is not None and current[2] >= info["depth"]:
+            return False
+        white_score = info["score"].white()
+        if white_score.is_mate():
+            kind, value = "mate", white_score.mate()
+        else:
+            kind, value = "cp", white_score.score()
+        pv = " ".join(move.uci() for move in info.get("pv", []))
+        self._remember(key, (kind, value, info["depth"], pv, engine_name))
+        self.dirty.add(key)
+        return True
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            old_key, _ = self.entries.popitem(last=False)
+            self.dirty.discard(old_key)
+
+    def flush(self):
+        """Записва променените позиции в SQLite (извиква се при спиране на анализа и при изход)"""
+        if self.db is None or not self.dirty:
+            self.dirty.clear()
+            return
+        rows = [(key,) + self.entries[key] for key in self.dirty if key in self.entries]
+        self.dirty.clear()
+        try:
+            self.db.executemany("INSERT INTO evals (key, kind, value, depth, pv, engine) VALUES (?, ?, ?, ?, ?, ?) "
+                                "ON CONFLICT(key) DO UPDATE SET kind = excluded.kind, value = excluded.value, "
+                                "depth = excluded.depth, pv = excluded.pv, engine = excluded.engine "
+                                "WHERE excluded.depth > evals.depth", rows)
+            self.db.commit()
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        self.flush()
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+class GameEvaluatorThread(QThread):
+    """Оценява позициите на заредена партия във фонов режим с пул от процеси на двигателя.
+    Всеки процес взима следващата позиция от общата опашка и я анализира с фиксиран бюджет."""
+    evaluated = pyqtSignal(int, object, str)
+    error = pyqtSignal(str)
+
+    def __init__(self, path, options, positions, limit, pool_size=2):
+        super().__init__()
+        self.path = path
+        self.options = options
+        self.positions = positions  # [(полуход, позиция след него)]
+        self.limit = limit
+        self.pool_size = max(1, min(pool_size, len(positions)))
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    # Същият интерфейс като EngineWorker, за да минава през App.retire_worker
+    shutdown = cancel
 
     def run(self):
-        if not HAS_ENGINE or not self.engine:
+        jobs = queue.Queue()
+        for job in self.positions:
+            jobs.put(job)
+        threads = [threading.Thread(target=self._evaluate_jobs, args=(jobs,), daemon=True)
+                   for _ in range(self.pool_size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _evaluate_jobs(self, jobs):
+        try:
+            engine = chess.engine.SimpleEngine.popen_uci(self.path)
+            engine.configure({name: value for name, value in self.options.items()
+                              if name in engine.options and not engine.options[name].is_managed()})
+        except Exception as e:
+            self.error.emit(str(e))
             return
+        engine_name = engine.id.get("name", "")
+        try:
+            while not self.cancelled.is_set():
+                try:
+                    ply, board = jobs.get_nowait()
+                except queue.Empty:
+                    break
+                with engine.analysis(board, self.limit) as analysis:
+                    for _ in analysis:
+                        if self.cancelled.is_set():
+                            analysis.stop()
+                    info = dict(analysis.info)
+                if not self.cancelled.is_set() and "score" in info:
+                    self.evaluated.emit(ply, info, engine_name)
+        except chess.engine.EngineError as e:
+            self.error.emit(str(e))
+        except chess.engine.EngineTerminatedError as e:
+            self.error.emit(str(e))
+        finally:
+            try:
+                engine.quit()
+            except Exception:
+                engine.close()
+
+
+class GameAnnotator:
+    """Анотира основната линия на партия: [%eval] след всеки ход, NAG за грешките
+    и точност на играчите по формулата на Lichess (спад на шанса за победа)"""
+    # Праг на спада на шанса за победа (%) -> NAG; при Lichess праговете 0.3/0.2/0.1
+    # са в скалата [-1, 1], което в скалата 0-100 на win_percent е 15/10/5
+    NAG_THRESHOLDS = ((15, chess.pgn.NAG_BLUNDER), (10, chess.pgn.NAG_MISTAKE), (5, chess.pgn.NAG_DUBIOUS_MOVE))
+
+    def __init__(self, engine, limit):
+        self.engine = engine
+        self.limit = limit
+
+    @staticmethod
+    def win_percent(cp):
+        cp = max(-1000, min(1000, cp))
+        return 50 + 50 * (2 / (1 + math.exp(-0.00368208 * cp)) - 1)
+
+    @staticmethod
+    def move_accuracy(win_before, win_after):
+        accuracy = 103.1668 * math.exp(-0.04354 * max(0.0, win_before - win_after)) - 3.1669
+        return max(0.0, min(100.0, accuracy))
+
+    def evaluate(self, board):
+        """PovScore и дълбочина на позицията (крайните позиции не се пращат на двигателя)"""
+        if board.is_checkmate():
+            return chess.engine.PovScore(chess.engine.Mate(0), board.turn), None
+        if board.is_game_over():
+            return chess.engine.PovScore(chess.engine.Cp(0), board.turn), None
+        info = self.engine.analyse(board, self.limit, game=self)
+        return info.get("score"), info.get("depth")
+
+    def annotate(self, game):
+        """Добавя анотациите в game и връща обобщението по цветове"""
+        board = game.board()
+        score, _ = self.evaluate(board)
+        summary = {color: {"accuracy": [], "blunders": 0, "mistakes": 0, "inaccuracies": 0}
+                   for color in (chess.WHITE, chess.BLACK)}
+        counters = {chess.pgn.NAG_BLUNDER: "blunders", chess.pgn.NAG_MISTAKE: "mistakes",
+                    chess.pgn.NAG_DUBIOUS_MOVE: "inaccuracies"}
+        for node in game.mainline():
+            mover = board.turn
+            board.push(node.move)
+            next_score, depth = self.evaluate(board)
+            if next_score is None:
+                score = None
+                continue
+            node.set_eval(next_score, depth)
+            if score is not None:
+                win_before = self.win_percent(score.pov(mover).score(mate_score=100000))
+                win_after = self.win_percent(next_score.pov(mover).score(mate_score=100000))
+                summary[mover]["accuracy"].append(self.move_accuracy(win_before, win_after))
+                for threshold, nag in self.NAG_THRESHOLDS:
+                    if win_before - win_after >= threshold:
+                        node.nags.add(nag)
+                        summary[mover][counters[nag]] += 1
+                        break
+            score = next_score
+
+        result = {}
+        for color, name in ((chess.WHITE, "White"), (chess.BLACK, "Black")):
+            moves = summary[color].pop("accuracy")
+            summary[color]["accuracy"] = round(sum(moves) / len(moves), 1) if moves else None
+            if moves:
+                game.headers[f"{name}Accuracy"] = f"{summary[color]['accuracy']:.1f}"
+            result[name.lower()] = summary[color]
+        game.headers["Annotator"] = self.engine.id.get("name", "PyChessPro+")
+        game.comment = " ".join(filter(None, [game.comment, "Accuracy: " + ", ".join(
+            f"{name.capitalize()} {'-' if data['accuracy'] is None else str(data['accuracy']) + '%'} "
+            f"({data['blunders']} ??, {data['mistakes']} ?, {data['inaccuracies']} ?!)"
+            for name, data in result.items())]))
+        return result
+
+
+# Всеки процес от пула на анотатора държи собствен UCI двигател
+annotator_engine = None
+annotator_config = None
+
+
+def annotator_worker_init(path, options, limit_kwargs):
+    global annotator_config
+    annotator_config = (path, options, limit_kwargs)
+    annotator_open_engine()
+    # Двигателят се затваря, когато пулът приключи процеса
+    multiprocessing.util.Finalize(None, annotator_close_engine, exitpriority=16)
+
+
+def annotator_open_engine():
+    global annotator_engine
+    path, options, _ = annotator_config
+    annotator_engine = chess.engine.SimpleEngine.popen_uci(path)
+    annotator_engine.configure({name: value for name, value in options.items()
+                                if name in annotator_engine.options and not annotator_engine.options[name].is_managed()})
+
+
+def annotator_close_engine():
+    global annotator_engine
+    if annotator_engine is not None:
+        try:
+            annotator_engine.quit()
+        except Exception:
+            annotator_engine.close()
+        annotator_engine = None
+
+
+def annotator_worker_run(pgn_text):
+    """Анотира една партия (подадена като PGN текст) -> (анотиран PGN, обобщение или грешка)"""
+    game = chess.pgn.read_game(io.StringIO(pgn_text))
+    if game is None:
+        return pgn_text, None, "empty game"
+    try:
+        if annotator_engine is None:
+            annotator_open_engine()
+        summary = GameAnnotator(annotator_engine, chess.engine.Limit(**annotator_config[2])).annotate(game)
+    except (chess.engine.EngineError, chess.engine.EngineTerminatedError, OSError) as e:
+        # Следващата партия в този процес стартира нов двигател
+        annotator_close_engine()
+        return pgn_text, None, str(e)
+    exporter = chess.pgn.StringExporter(headers=True, variations=True, comments=True)
+    return game.accept(exporter), summary, None
+
+
+def iter_pgn_games(handle):
+    """Чете партиите една по една от отворен PGN файл; повредените се прескачат"""
+    while True:
         try:
-            if self.is_analysis:
-                # БЕЗКРАЕН АНАЛИЗ - без ограничение на дълбочина или време
-                with self.engine.analysis(self.board, chess.engine.Limit()) as analysis:
-                    for info in analysis:
-                        if self._stop_requested:
-                            break
-                        self.info.emit(info)
+            game = chess.pgn.read_game(handle)
+        except Exception as e:
+            print(f"Грешка при парсване на игра: {e}")
+            continue
+        if game is None:
+            break
+        yield game
+
+
+def parse_time_control(text):
+    """"[ходове/]база[+инкремент]" в секунди -> (база, инкремент, ходове за сесия)"""
+    moves_per_session = 0
+    if "/" in text:
+        moves_text, text = text.split("/", 1)
+        moves_per_session = int(moves_text)
+    base, _, increment = text.partition("+")
+    return float(base), float(increment or 0), moves_per_session
+
+
+def load_opening_positions(path):
+    """Стартови позиции от EPD (по една на ред) или PGN (краят на основната линия на всяка партия)"""
+    if not path:
+        return [chess.Board()]
+    boards = []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        if path.lower().endswith(".epd"):
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    board = chess.Board()
+                    board.set_epd(line)
+                    boards.append(board)
+        else:
+            for game in iter_pgn_games(f):
+                board = game.board()
+                for move in game.mainline_moves():
+                    board.push(move)
+                boards.append(board)
+    return boards or [chess.Board()]
+
+
+class OpeningSuite:
+    """Набор от стартови позиции (EPD/PGN) за двигател срещу двигател. Всяка позиция се играе
+    два пъти с разменени цветове; курсорът брои изиграните партии и се пази между сесиите."""
+    ORDERS = ("sequential", "random")
+
+    def __init__(self, path, order="sequential", cursor=0):
+        self.path = path
+        self.order = order if order in self.ORDERS else "sequential"
+        self.cursor = cursor
+        self.positions = load_opening_positions(path)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def position_index(self, game_number):
+        index = game_number // 2
+        if self.order == "random":
+            # Всеки цикъл е разбъркан по различен, но възпроизводим начин - без повторения в рамките на цикъла
+            cycle, offset = divmod(index, len(self.positions))
+            order = list(range(len(self.positions)))
+            random.Random(f"{os.path.basename(self.path)}:{cycle}").shuffle(order)
+            return order[offset]
+        return index % len(self.positions)
+
+    def next_game(self):
+        """(копие на позицията, разменени цветове) за следващата партия; курсорът се мести напред"""
+        game_number = self.cursor
+        self.cursor += 1
+        return self.positions[self.position_index(game_number)].copy(), game_number % 2 == 1
+
+
+class MatchStatistics:
+    """Статистика на мач от гледна точка на първия играч: Elo с 95% интервал, LOS,
+    пентаномни двойки (едно откриване с двата цвята) и SPRT с граници elo0/elo1"""
+
+    def __init__(self, elo0=None, elo1=None, alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+        self.wins = self.draws = self.losses = 0
+        self.pentanomial = [0] * 5  # двойки с 0, 0.5, 1, 1.5 и 2 точки
+        self.open_pairs = {}
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def add(self, score, pair_id=None):
+        """score е 1, 0.5 или 0 за първия играч; двете партии на двойката имат общ pair_id"""
+        if score == 1:
+            self.wins += 1
+        elif score == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+        if pair_id is not None:
+            if pair_id in self.open_pairs:
+                self.pentanomial[int((self.open_pairs.pop(pair_id) + score) * 2)] += 1
             else:
-                if self.time_control > 0:
-                    remaining_time = self.time_control
-                    moves_to_go = 40
-                    
-                    time_for_move = remaining_time / moves_to_go + self.increment
-                    min_time = 0.1
-                    time_for_move = max(time_for_move, min_time)
-                    max_time = remaining_time * 0.3
-                    time_for_move = min(time_for_move, max_time)
-                    
-                    if remaining_time < 10:
-                        limit = chess.engine.Limit(time=time_for_move)
-                    else:
-                        limit = chess.engine.Limit(time=time_for_move)
-                else:
-                    limit = chess.engine.Limit(depth=15)
-                
-                if self.board.is_game_over():
-                    return
-                
+                self.open_pairs[pair_id] = score
+
+    @staticmethod
+    def score_to_elo(score):
+        score = min(max(score, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / score - 1)
+
+    @staticmethod
+    def elo_to_score(elo):
+        return 1 / (1 + 10 ** (-elo / 400))
+
+    def sample(self):
+        """(средна точка на партия, дисперсия на наблюдение, брой наблюдения).
+        При завършени двойки наблюдението е двойката - така се отчита корелацията на цветовете."""
+        pairs = sum(self.pentanomial)
+        if pairs:
+            counts = [(index / 4, count) for index, count in enumerate(self.pentanomial)]
+            n = pairs
+        else:
+            counts = [(1.0, self.wins), (0.5, self.draws), (0.0, self.losses)]
+            n = self.games
+        if not n:
+            return 0.5, 0.0, 0
+        mean = sum(value * count for value, count in counts) / n
+        variance = sum(count * (value - mean) ** 2 for value, count in counts) / n
+        return mean, variance, n
+
+    def elo(self):
+        """(Elo, половин ширина на 95% интервал)"""
+        mean, variance, n = self.sample()
+        if not n:
+            return 0.0, 0.0
+        margin = 1.959964 * math.sqrt(variance / n)
+        low, high = self.score_to_elo(mean - margin), self.score_to_elo(mean + margin)
+        return self.score_to_elo(mean), (high - low) / 2
+
+    def los(self):
+        """Вероятност първият да е по-силен (равните не носят информация)"""
+        decisive = self.wins + self.losses
+        if not decisive:
+            return 0.5
+        return 0.5 * (1 + math.erf((self.wins - self.losses) / math.sqrt(2 * decisive)))
+
+    def llr(self):
+        """Log-likelihood ratio на обобщения SPRT (нормално приближение)"""
+        # Като cutechess: без победи, равни и загуби дисперсията не е надеждна
+        if self.elo0 is None or not (self.wins and self.draws and self.losses):
+            return 0.0
+        mean, variance, n = self.sample()
+        if variance <= 0:
+            return 0.0
+        score0, score1 = self.elo_to_score(self.elo0), self.elo_to_score(self.elo1)
+        return n * (score1 - score0) * (2 * mean - score0 - score1) / (2 * variance)
+
+    def bounds(self):
+        return math.log(self.beta / (1 - self.alpha)), math.log((1 - self.beta) / self.alpha)
+
+    def sprt_result(self):
+        """"H1" (elo1 е вярна), "H0" или None, докато тестът не е приключил"""
+        if self.elo0 is None:
+            return None
+        llr = self.llr()
+        lower, upper = self.bounds()
+        if llr >= upper:
+            return "H1"
+        if llr <= lower:
+            return "H0"
+        return None
+
+    def summary(self):
+        elo, margin = self.elo()
+        lines = [f"Games {self.games}: +{self.wins} ={self.draws} -{self.losses}  "
+                 f"Elo {elo:+.1f} +/- {margin:.1f}  LOS {self.los() * 100:.1f}%"]
+        if any(self.pentanomial):
+            lines.append("Ptnml(0-2): " + ", ".join(str(count) for count in self.pentanomial))
+        if self.elo0 is not None:
+            lower, upper = self.bounds()
+            verdict = self.sprt_result()
+            lines.append(f"SPRT [{self.elo0:g}, {self.elo1:g}]: LLR {self.llr():.2f} ({lower:.2f}, {upper:.2f})"
+                         + (f" - {verdict} accepted" if verdict else ""))
+        return "\n".join(lines)
+
+
+class Adjudicator:
+    """Присъжда резултат в партии двигател срещу двигател, без да се доиграват мат или правилото за 75 хода.
+    Оценките са от търсенето на двигателя на ход; правилата с 0 ходове/фигури са изключени."""
+
+    def __init__(self, resign_score=1000, resign_moves=0, draw_score=10, draw_moves=0, draw_move_number=40,
+                 tb_pieces=0, syzygy_path="", prober=None):
+        self.resign_score = resign_score
+        self.resign_moves = resign_moves
+        self.draw_score = draw_score
+        self.draw_moves = draw_moves
+        self.draw_move_number = draw_move_number
+        self.tb_pieces = tb_pieces
+        # Споделен prober (GUI) или собствен (по един за нишка в турнира)
+        self.owns_prober = prober is None
+        if prober is None and tb_pieces and syzygy_path:
+            prober = TablebaseProber(syzygy_path)
+        self.prober = prober
+        self.scores = []
+
+    @classmethod
+    def from_settings(cls, settings, prober=None):
+        return cls(settings.get("adjudicate_resign_score", 1000), settings.get("adjudicate_resign_moves", 5),
+                   settings.get("adjudicate_draw_score", 10), settings.get("adjudicate_draw_moves", 10),
+                   settings.get("adjudicate_draw_move_number", 40), settings.get("adjudicate_tb_pieces", 6),
+                   settings.get("syzygy_path", ""), prober)
+
+    def reset(self):
+        self.scores = []
+
+    def update(self, board, score):
+        """Извиква се след всеки ход с оценката от търсенето за него (PovScore или None).
+        Връща (резултат, "resign"|"draw"|"tablebase") или None"""
+        self.scores.append(None if score is None else score.white().score(mate_score=100000))
+        verdict = self.probe_tablebase(board)
+        if verdict is not None:
+            return verdict
+        # N хода на всеки от двигателите = 2N последователни полухода
+        if self.resign_moves and len(self.scores) >= 2 * self.resign_moves:
+            recent = self.scores[-2 * self.resign_moves:]
+            if None not in recent:
+                if all(cp >= self.resign_score for cp in recent):
+                    return "1-0", "resign"
+                if all(cp <= -self.resign_score for cp in recent):
+                    return "0-1", "resign"
+        if (self.draw_moves and board.fullmove_number > self.draw_move_number
+                and len(self.scores) >= 2 * self.draw_moves):
+            recent = self.scores[-2 * self.draw_moves:]
+            if None not in recent and all(abs(cp) <= self.draw_score for cp in recent):
+                return "1/2-1/2", "draw"
+        return None
+
+    def probe_tablebase(self, board):
+        if self.prober is None or chess.popcount(board.occupied) > self.tb_pieces:
+            return None
+        probe = self.prober.probe(board)
+        if probe is None:
+            return None
+        wdl = probe[0]
+        # ±1 (спечелено/загубено само извън правилото за 50 хода) се брои за реми
+        if wdl == 2:
+            return ("1-0" if board.turn == chess.WHITE else "0-1"), "tablebase"
+        if wdl == -2:
+            return ("0-1" if board.turn == chess.WHITE else "1-0"), "tablebase"
+        return "1/2-1/2", "tablebase"
+
+    def close(self):
+        if self.prober is not None and self.owns_prober:
+            self.prober.close()
+        self.prober = None
+
+
+class Tournament:
+    """Турнир между UCI двигатели без GUI. Партиите се играят едновременно в пул от нишки;
+    всяка нишка държи собствени процеси на участниците и ги преизползва между партиите."""
+    FORMATS = ("round-robin", "gauntlet")
+
+    def __init__(self, engines, format="round-robin", rounds=1, time_control=(60.0, 0.0, 0), limit_kwargs=None,
+                 openings=None, concurrency=1, pgn_path=None, results_path=None, time_margin=0.05, statistics=None,
+                 adjudication=None):
+        self.engines = engines  # [(име, път, UCI опции)]
+        self.format = format
+        self.rounds = rounds
+        self.time_control = time_control
+        self.limit_kwargs = limit_kwargs or {}
+        self.openings = openings or [chess.Board()]
+        self.concurrency = max(1, concurrency)
+        self.pgn_path = pgn_path
+        self.results_path = results_path
+        self.time_margin = time_margin
+        # Мач от двама: статистика за първия играч и спиране при приключил SPRT
+        self.statistics = statistics
+        # Настройки за Adjudicator.from_settings (ключовете на Settings);
+        # всяка нишка има собствен съдия (таблиците не са за споделяне между нишки)
+        self.adjudication = adjudication
+        self.results = []
+        self.stop_event = threading.Event()
+        self.write_lock = threading.Lock()
+        self.local = threading.local()
+        self.spawned = []
+        self.adjudicators = []
+
+    def schedule(self):
+        """(№, кръг, откриване, бели, черни); всяко откриване се играе и с двата цвята"""
+        indices = range(len(self.engines))
+        if self.format == "gauntlet":
+            pairs = [(0, other) for other in indices if other != 0]
+        else:
+            pairs = list(itertools.combinations(indices, 2))
+        jobs = []
+        for round_number in range(1, self.rounds + 1):
+            for opening_index in range(len(self.openings)):
+                for first, second in pairs:
+                    jobs.append((round_number, opening_index, first, second))
+                    jobs.append((round_number, opening_index, second, first))
+        return [(number,) + job for number, job in enumerate(jobs, 1)]
+
+    def engine_for(self, index):
+        """Процесът на участника за текущата нишка (нов при първо ползване или след срив)"""
+        engines = getattr(self.local, "engines", None)
+        if engines is None:
+            engines = self.local.engines = {}
+        engine = engines.get(index)
+        if engine is None or engine.returncode.done():
+            _, path, options = self.engines[index]
+            engine = chess.engine.SimpleEngine.popen_uci(path)
+            engine.configure({name: value for name, value in options.items()
+                              if name in engine.options and not engine.options[name].is_managed()})
+            engines[index] = engine
+            with self.write_lock:
+                self.spawned.append(engine)
+        return engine
+
+    def adjudicator(self):
+        if self.adjudication is None:
+            return None
+        adjudicator = getattr(self.local, "adjudicator", None)
+        if adjudicator is None:
+            adjudicator = self.local.adjudicator = Adjudicator.from_settings(self.adjudication)
+            with self.write_lock:
+                self.adjudicators.append(adjudicator)
+        adjudicator.reset()
+        return adjudicator
+
+    def discard_engine(self, index):
+        engine = getattr(self.local, "engines", {}).pop(index, None)
+        if engine is not None:
+            engine.close()
+
+    def play_game(self, number, round_number, opening_index, white, black):
+        if self.stop_event.is_set():
+            return None
+        board = self.openings[opening_index].copy()
+        players = {chess.WHITE: white, chess.BLACK: black}
+        base, increment, moves_per_session = self.time_control
+        clocks = {chess.WHITE: base, chess.BLACK: base}
+        time_managers = {chess.WHITE: TimeManager(), chess.BLACK: TimeManager()}
+        game_id = object()
+        adjudicator = self.adjudicator()
+        result = termination = None
+        while not self.stop_event.is_set():
+            outcome = board.outcome(claim_draw=True)
+            if outcome is not None:
+                result, termination = outcome.result(), outcome.termination.name.lower().replace("_", " ")
+                break
+            turn = board.turn
+            loss = "0-1" if turn == chess.WHITE else "1-0"
+            if self.limit_kwargs:
+                limit = chess.engine.Limit(**self.limit_kwargs)
+            else:
+                limit = time_managers[turn].build_limit(board, clocks[chess.WHITE], clocks[chess.BLACK],
+                                                        increment, moves_per_session)
+            started = time.monotonic()
+            try:
+                play = self.engine_for(players[turn]).play(board, limit, game=game_id,
+                                                           info=chess.engine.INFO_BASIC | chess.engine.INFO_SCORE)
+            except (chess.engine.EngineError, chess.engine.EngineTerminatedError, OSError):
+                self.discard_engine(players[turn])
+                result, termination = loss, "engine failure"
+                break
+            elapsed = time.monotonic() - started
+            if play.move is None or play.move not in board.legal_moves:
+                result, termination = loss, "illegal move"
+                break
+            board.push(play.move)
+            if not self.limit_kwargs:
+                if "time" in play.info:
+                    time_managers[turn].record_overhead(elapsed, play.info["time"])
+                clocks[turn] -= elapsed
+                if clocks[turn] < -self.time_margin:
+                    board.pop()
+                    result, termination = loss, "time forfeit"
+                    break
+                clocks[turn] += increment
+                if time_managers[turn].session_completed(board, turn, moves_per_session):
+                    clocks[turn] += base
+            if adjudicator is not None and not board.is_game_over():
+                verdict = adjudicator.update(board, play.info.get("score"))
+                if verdict is not None:
+                    result, termination = verdict[0], f"adjudication: {verdict[1]}"
+                    break
+        if result is None:
+            return None
+        record = {"game": number, "round": round_number, "opening": opening_index,
+                  "white": self.engines[white][0], "black": self.engines[black][0],
+                  "result": result, "termination": termination, "plies": len(board.move_stack)}
+        self.save_game(board, record)
+        return record
+
+    def save_game(self, board, record):
+        """PGN и ред с резултата се дописват веднага след всяка партия"""
+        game = chess.pgn.Game.from_board(board)
+        base, increment, moves_per_session = self.time_control
+        time_control = (f"{moves_per_session}/" if moves_per_session else "") + f"{base:g}+{increment:g}"
+        game.headers.update({"Event": f"PyChessPro+ {self.format}", "Site": "?",
+                             "Date": datetime.now().strftime("%Y.%m.%d"), "Round": str(record["round"]),
+                             "White": record["white"], "Black": record["black"], "Result": record["result"],
+                             "TimeControl": "-" if self.limit_kwargs else time_control,
+                             "Termination": record["termination"]})
+        with self.write_lock:
+            self.results.append(record)
+            if self.statistics is not None:
+                white_points = {"1-0": 1.0, "0-1": 0.0}.get(record["result"], 0.5)
+                first_is_white = record["white"] == self.engines[0][0]
+                # Партиите 2k-1 и 2k са едно откриване с разменени цветове
+                self.statistics.add(white_points if first_is_white else 1.0 - white_points, (record["game"] + 1) // 2)
+                if self.statistics.sprt_result():
+                    self.stop()
+            if self.pgn_path:
+                with open(self.pgn_path, "a", encoding="utf-8") as f:
+                    f.write(str(game) + "\n\n")
+            if self.results_path:
+                with open(self.results_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+
+    def standings(self):
+        """[(име, точки, партии, победи, равни, загуби)] по низходящ брой точки"""
+        table = {name: [0.0, 0, 0, 0, 0] for name, _, _ in self.engines}
+        for record in list(self.results):
+            white_points = {"1-0": 1.0, "0-1": 0.0}.get(record["result"], 0.5)
+            for name, points in ((record["white"], white_points), (record["black"], 1.0 - white_points)):
+                row = table[name]
+                row[0] += points
+                row[1] += 1
+                row[2 if points == 1.0 else 3 if points == 0.5 else 4] += 1
+        return sorted(((name,) + tuple(row) for name, row in table.items()), key=lambda row: -row[1])
+
+    def run(self, on_game=None):
+        """Изиграва целия график; on_game(record) се вика от нишката на партията"""
+        def play(job):
+            record = self.play_game(*job)
+            if record is not None and on_game is not None:
+                on_game(record)
+            return record
+
+        try:
+            with ThreadPoolExecutor(self.concurrency) as executor:
+                try:
+                    list(executor.map(play, self.schedule()))
+                except BaseException:
+                    # Прекъсване: текущите партии спират на следващия ход
+                    self.stop()
+                    raise
+        finally:
+            for engine in self.spawned:
                 try:
-                    with self.engine.analysis(self.board, limit) as analysis:
-                        for info in analysis:
-                            if self._stop_requested:
-                                break
-                            self.info.emit(info)
+                    engine.quit()
                 except Exception:
-                    if not self._stop_requested:
-                        return
-                
-                if not self._stop_requested:
-                    try:
-                        result = self.engine.play(self.board, limit)
-                        if result and result.move:
-                            self.bestmove.emit(result.move)
-                    except Exception:
-                        if not self._stop_requested:
-                            pass
-        except chess.engine.EngineTerminatedError:
-            if not self._stop_requested:
-                self.error.emit("Engine terminated")
-        except Exception:
-            if not self._stop_requested:
-                self.error.emit("Engine error")
+                    engine.close()
+            self.spawned = []
+            for adjudicator in self.adjudicators:
+                adjudicator.close()
+            self.adjudicators = []
+        return self.standings()
 
     def stop(self):
-        self._stop_requested = True
-        self.requestInterruption()
-        self.engine = None
-        time.sleep(0.1)
+        self.stop_event.set()
+
+
+class TablebaseProber:
+    """Syzygy WDL/DTZ с LRU кеш по Zobrist хеш: повтарящи се ендшпили (между партии и при
+    навигация) не четат диска отново. WDL/DTZ са от гледна точка на страната на ход."""
+
+    def __init__(self, path, max_entries=100000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.tablebase = None
+        self.max_pieces = 0
+        if not (path and HAS_SYZYGY):
+            return
+        directories = [directory for directory in path.split(os.pathsep) if os.path.isdir(directory)]
+        if not directories:
+            return
+        self.tablebase = chess.syzygy.Tablebase()
+        for directory in directories:
+            self.tablebase.add_directory(directory)
+        # Имената на таблиците са напр. "KQvK" - броят фигури е дължината без "v"
+        self.max_pieces = max((len(name) - 1 for name in self.tablebase.wdl), default=0)
+
+    def covers(self, board):
+        return (self.tablebase is not None and chess.popcount(board.occupied) <= self.max_pieces
+                and not board.castling_rights)
+
+    def probe(self, board):
+        """(wdl, dtz) или None извън таблиците (или при липсваща/повредена таблица);
+        dtz е None, ако липсва DTZ таблица"""
+        if not self.covers(board):
+            return None
+        key = EvalCache.key(board)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        try:
+            wdl = self.tablebase.probe_wdl(board)
+        except (KeyError, OSError, ValueError):
+            return None
+        try:
+            dtz = self.tablebase.probe_dtz(board)
+        except (KeyError, OSError, ValueError):
+            dtz = None
+        self.entries[key] = (wdl, dtz)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return wdl, dtz
+
+    def close(self):
+        if self.tablebase is not None:
+            self.tablebase.close()
+            self.tablebase = None
+        self.entries.clear()
+
+
+class ByteCountingReader:
+    """Текстов readline() върху двоичен файл, който брои прочетените байтове
+    (TextIOWrapper.tell() е бавен и непрозрачен)"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.position = raw.tell()
+
+    def readline(self):
+        line = self.raw.readline()
+        self.position += len(line)
+        return line.decode("utf-8", errors="ignore")
+
+
+class PGNIndexVisitor(chess.pgn.HeadersBuilder):
+    """Заглавия + брой полуходове в главната линия, без SAN ходовете да се проверяват"""
+
+    def begin_headers(self):
+        self.plies = 0
+        return super().begin_headers()
+
+    def end_headers(self):
+        return None
+
+    def begin_variation(self):
+        return chess.pgn.SKIP
+
+    def begin_parse_san(self, board, san):
+        self.plies += 1
+        return chess.pgn.SKIP
+
+    def result(self):
+        if self.plies and not self.headers.get("PlyCount"):
+            self.headers["PlyCount"] = str(self.plies)
+        return self.headers
+
+
+def iter_pgn_index(raw, end=None, count_moves=False):
+    """Сканира само заглавията от текущата позиция нататък (до партиите, започващи преди end):
+    (отместване, дължина в байтове, полета по PGNDatabase.HEADER_FIELDS).
+    С count_moves се брои и главната линия, когато липсва PlyCount."""
+    reader = ByteCountingReader(raw)
+    visitor = PGNIndexVisitor if count_moves else chess.pgn.HeadersBuilder
+    while True:
+        # Празните редове преди партията не влизат в нея, така отместването
+        # съвпада с границите от pgn_chunk_boundaries
+        offset = raw.tell()
+        line = raw.readline()
+        while line and not line.strip():
+            offset = raw.tell()
+            line = raw.readline()
+        if not line or (end is not None and offset >= end):
+            break
+        raw.seek(offset)
+        reader.position = offset
+        try:
+            headers = chess.pgn.read_game(reader, Visitor=visitor)
+        except Exception as e:
+            print(f"Грешка при парсване на игра: {e}")
+            continue
+        if headers is None:
+            break
+        fields = tuple(headers.get(name, "") for name in PGNDatabase.HEADER_FIELDS)
+        yield offset, reader.position - offset, fields
+
+
+PGN_TAG_LINE = re.compile(rb'\[[A-Za-z0-9_]+\s+"')
+
+
+def pgn_chunk_boundaries(handle, start, size, chunk_size):
+    """Разделя [start, size) на парчета около chunk_size байта; всяка граница е начало на партия
+    (таг ред след празен ред)"""
+    bounds = [start]
+    position = start + chunk_size
+    while position < size:
+        handle.seek(position)
+        handle.readline()  # недовършеният ред
+        previous_blank = False
+        while True:
+            line_start = handle.tell()
+            line = handle.readline()
+            if not line:
+                line_start = size
+                break
+            if previous_blank and PGN_TAG_LINE.match(line):
+                break
+            previous_blank = not line.strip()
+        if line_start >= size:
+            break
+        bounds.append(line_start)
+        position = line_start + chunk_size
+    bounds.append(size)
+    return bounds
+
+
+def index_pgn_chunk(path, start, end, count_moves=False):
+    """Индексира партиите, започващи в [start, end) - работа за пула от процеси"""
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        return list(iter_pgn_index(handle, end, count_moves))
+
+
+class PGNDatabase:
+    """PGN база като индекс по отместване; дърветата с ходове се парсват при поискване
+    и се пазят в ограничен LRU, така че паметта не расте с броя на материализираните партии"""
+
+    HEADER_FIELDS = ("Event", "White", "Black", "Result", "Date", "ECO", "Opening", "PlyCount")
+
+    def __init__(self, path=None, cache_size=64, index=None):
+        self.path = path
+        self.cache_size = cache_size
+        self.index = index  # PGNSidecarIndex от диска; новите записи са в self.entries
+        self.entries = []
+        self.games = OrderedDict()
+        self.move_counts = {}
+        self.handle = None
+
+    def __len__(self):
+        return (len(self.index) if self.index is not None else 0) + len(self.entries)
+
+    def __getitem__(self, index):
+        return self.game(index)
+
+    def __iter__(self):
+        # Обхождане на цялата база (напр. запис) без да се пълни кешът
+        for index in range(len(self)):
+            yield self.game(index, remember=False)
+
+    def add(self, entries):
+        self.entries.extend(entries)
+
+    def entry(self, index):
+        mapped = len(self.index) if self.index is not None else 0
+        if index < mapped:
+            return self.index[index]
+        return self.entries[index - mapped]
+
+    def headers(self, index):
+        """Индексираните заглавия на партията като речник (без празните)"""
+        return {name: value for name, value in zip(self.HEADER_FIELDS, self.entry(index)[2]) if value}
+
+    def known_move_count(self, index):
+        """Брой полуходове, ако е известен без парсване (PlyCount или вече парсвана партия)"""
+        if index in self.move_counts:
+            return self.move_counts[index]
+        ply_count = self.entry(index)[2][self.HEADER_FIELDS.index("PlyCount")]
+        return int(ply_count) if ply_count.isdigit() else None
+
+    def move_count(self, index):
+        """Брой полуходове; при нужда главната линия се преброява без пълно парсване"""
+        count = self.known_move_count(index)
+        if count is None:
+            headers = chess.pgn.read_game(io.StringIO(self.raw(index)), Visitor=PGNIndexVisitor)
+            ply_count = headers.get("PlyCount", "") if headers is not None else ""
+            count = self.move_counts[index] = int(ply_count) if ply_count.isdigit() else 0
+        return count
+
+    def raw(self, index):
+        offset, length, _ = self.entry(index)
+        if self.handle is None:
+            self.handle = open(self.path, "rb")
+        self.handle.seek(offset)
+        return self.handle.read(length).decode("utf-8", errors="ignore")
+
+    def game(self, index, remember=True):
+        if index < 0:
+            index += len(self)
+        if index in self.games:
+            self.games.move_to_end(index)
+            return self.games[index]
+        game = chess.pgn.read_game(io.StringIO(self.raw(index))) or chess.pgn.Game()
+        self.move_counts[index] = sum(1 for _ in game.mainline_moves())
+        if remember:
+            self.games[index] = game
+            while len(self.games) > self.cache_size:
+                self.games.popitem(last=False)
+        return game
+
+    def install_index(self, tmp_path):
+        """Заменя индексния файл с новозаписания (tmp_path) и минава на него през mmap,
+        така че записите в паметта се освобождават. При неуспех базата остава непроменена"""
+        try:
+            new_index = PGNSidecarIndex(tmp_path)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Индексът не е записан: {e}")
+            PGNSidecarIndex.discard(tmp_path)
+            return
+        if len(new_index) != len(self):
+            new_index.close()
+            PGNSidecarIndex.discard(tmp_path)
+            return
+
+        # Под Windows mmap-нат файл не може да бъде заменен, затова старият се затваря преди замяната;
+        # новият остава отворен (преименуването не засяга mmap-а)
+        old_count = len(self.index) if self.index is not None else None
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+        try:
+            os.replace(tmp_path, PGNSidecarIndex.index_path(self.path))
+        except OSError as e:
+            print(f"Индексът не е записан: {e}")
+            if old_count is not None:
+                old_index = PGNSidecarIndex.open(self.path)
+                if old_index is None or len(old_index) != old_count:
+                    # Старият индекс не може да се отвори отново: остава временният
+                    if old_index is not None:
+                        old_index.close()
+                    self.index = new_index
+                    self.entries = []
+                    return
+                self.index = old_index
+            new_index.close()
+            PGNSidecarIndex.discard(tmp_path)
+            return
+        self.index = new_index
+        self.entries = []
+
+    def reindex(self, entries):
+        """Минава на новите отмествания след презапис на файла; редът на партиите е същият,
+        затова кешът остава валиден"""
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+        self.entries = list(entries)
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+        self.games.clear()
+
+
+class PGNSidecarIndex:
+    """Двоичен индекс до PGN файла (games.pgn.idx), който се чете през mmap.
+
+    Съдържа отместванията и индексираните заглавия на партиите (низовете са в обща
+    таблица без повторения) и отпечатък на файла: индексиран размер, mtime и хеш от извадка.
+    Така непромененият файл се отваря веднага, а при добавени в края партии се сканира само краят."""
+
+    SUFFIX = ".idx"
+    MAGIC = b"PCPGNIDX"
+    VERSION = 1
+    # magic, версия, индексиран размер, mtime_ns, хеш, брой партии, начало на низовете
+    HEADER = struct.Struct("<8sIQq16sQQ")
+    # отместване, дължина и (начало, дължина) на всяко поле в таблицата с низове
+    RECORD = struct.Struct("<QI" + "IH" * len(PGNDatabase.HEADER_FIELDS))
+    SAMPLE_CHUNKS = 16
+    SAMPLE_SIZE = 4096
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, self.indexed_size, self.mtime_ns, self.sample,
+             self.count, self.strings) = self.HEADER.unpack_from(self.data, 0)
+            if (magic != self.MAGIC or version != self.VERSION
+                    or self.strings != self.HEADER.size + self.count * self.RECORD.size
+                    or self.strings > len(self.data)):
+                raise ValueError(f"Невалиден индекс: {path}")
+        except (struct.error, ValueError):
+            self.data.close()
+            raise
+
+    @classmethod
+    def index_path(cls, pgn_path):
+        return pgn_path + cls.SUFFIX
+
+    @classmethod
+    def open(cls, pgn_path):
+        """Индексът на PGN файла или None, ако липсва или е повреден"""
+        try:
+            return cls(cls.index_path(pgn_path))
+        except (OSError, ValueError, struct.error):
+            return None
+
+    @staticmethod
+    def discard(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @classmethod
+    def sample_hash(cls, handle, size):
+        """Хеш от равномерно разпределени парчета от първите size байта (и последното парче)"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(size).encode())
+        step = max(size // cls.SAMPLE_CHUNKS, 1)
+        positions = list(range(0, size, step))[:cls.SAMPLE_CHUNKS]
+        positions.append(max(size - cls.SAMPLE_SIZE, 0))
+        for position in positions:
+            handle.seek(position)
+            digest.update(handle.read(min(cls.SAMPLE_SIZE, size - position)))
+        return digest.digest()
+
+    def state(self, pgn_path):
+        """"full" за непроменен файл, "tail" ако след индексираната част са добавени данни,
+        None ако индексът е остарял"""
+        try:
+            stat = os.stat(pgn_path)
+            if stat.st_size < self.indexed_size:
+                return None
+            if stat.st_size == self.indexed_size and stat.st_mtime_ns != self.mtime_ns:
+                return None
+            with open(pgn_path, "rb") as handle:
+                if self.sample_hash(handle, self.indexed_size) != self.sample:
+                    return None
+        except OSError:
+            return None
+        return "full" if stat.st_size == self.indexed_size else "tail"
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        values = self.RECORD.unpack_from(self.data, self.HEADER.size + index * self.RECORD.size)
+        fields = tuple(self.data[self.strings + start:self.strings + start + length].decode("utf-8", errors="ignore")
+                       for start, length in zip(values[2::2], values[3::2]))
+        return values[0], values[1], fields
+
+    def __iter__(self):
+        return (self[index] for index in range(self.count))
+
+    def close(self):
+        self.data.close()
+
+    @classmethod
+    def write(cls, pgn_path, entries, indexed_size, mtime_ns):
+        """Записва индекса във временен файл до PGN-а и връща пътя му"""
+        tmp_path = cls.index_path(pgn_path) + ".tmp"
+        with open(pgn_path, "rb") as handle:
+            sample = cls.sample_hash(handle, indexed_size)
+        strings = bytearray()
+        string_offsets = {}
+        count = 0
+        try:
+            with open(tmp_path, "wb") as out:
+                out.write(bytes(cls.HEADER.size))
+                for offset, length, fields in entries:
+                    values = [offset, length]
+                    for value in fields:
+                        data = value.encode("utf-8")[:0xFFFF]
+                        start = string_offsets.get(data)
+                        if start is None:
+                            start = string_offsets[data] = len(strings)
+                            strings += data
+                        values += (start, len(data))
+                    out.write(cls.RECORD.pack(*values))
+                    count += 1
+                out.write(strings)
+                out.seek(0)
+                out.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, indexed_size, mtime_ns, sample,
+                                          count, cls.HEADER.size + count * cls.RECORD.size))
+        except BaseException:
+            cls.discard(tmp_path)
+            raise
+        return tmp_path
 
 
 class PGNLoaderThread(QThread):
-    """Тред за зареждане на PGN файлове с прогрес"""
+    """Тред за зареждане на PGN файлове с прогрес.
+
+    Файлът се чете еднократно и се индексират само заглавията; записите от индекса
+    се изпращат на порции още докато се сканира, а прогресът е прочетени байтове / размер.
+    Валиден .idx файл до PGN-а се ползва наготово и се сканира само добавеният край;
+    след пълно сканиране индексът се записва наново. Големите файлове се делят на парчета
+    по границите на партиите и се индексират в пул от процеси; резултатите идват по реда във файла."""
     progress = pyqtSignal(int)
-    games_loaded = pyqtSignal(list)
+    index_loaded = pyqtSignal(object)  # PGNSidecarIndex от предишно отваряне
+    games_loaded = pyqtSignal(list)  # поредна порция записи (отместване, дължина, полета)
+    index_written = pyqtSignal(str)  # временен файл с обновения индекс
+    loading_finished = pyqtSignal(int, bool)  # общ брой, прекъснато
     error = pyqtSignal(str)
-    
-    def __init__(self, file_path):
+
+    BATCH_SIZE = 5000
+    BATCH_INTERVAL = 0.25  # секунди между порциите
+    PARALLEL_MIN_BYTES = 32 * 1024 * 1024  # под това стартирането на процесите не си струва
+    CHUNK_BYTES = (1024 * 1024, 16 * 1024 * 1024)
+
+    def __init__(self, file_path, processes=1, count_moves=False):
         super().__init__()
         self.file_path = file_path
-    
+        self.processes = processes
+        self.count_moves = count_moves
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    shutdown = cancel
+
     def run(self):
         try:
-            games = []
-            
-            # Отваряме файла и преброяваме общия брой редове за прогрес
-            with open(self.file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                total_lines = sum(1 for _ in f)
-            
-            # Зареждаме игрите с прогрес
-            with open(self.file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines_read = 0
-                while True:
-                    # Използваме read_game с файловия обект
-                    try:
-                        game = chess.pgn.read_game(f)
-                        if game is None:
-                            break
-                        games.append(game)
-                        
-                        # Актуализираме прогреса
-                        lines_read = f.tell()
-                        if total_lines > 0:
-                            progress = int((lines_read / total_lines) * 100)
-                            self.progress.emit(min(progress, 99))
-                    except Exception as e:
-                        print(f"Грешка при парсване на игра: {e}")
-                        continue
-            
-            self.progress.emit(100)
-            self.games_loaded.emit(games)
-            
+            stat = os.stat(self.file_path)
+            total_bytes = stat.st_size
+            batch = []
+            new_entries = []
+            count = 0
+            last_emit = 0.0  # първата партия излиза веднага
+            last_progress = -1
+
+            index = PGNSidecarIndex.open(self.file_path)
+            state = index.state(self.file_path) if index is not None else None
+            if state is None:
+                if index is not None:
+                    index.close()
+                start = 0
+            else:
+                start = index.indexed_size
+                count = len(index)
+                self.index_loaded.emit(index)
+
+            if self.processes > 1 and total_bytes - start >= self.PARALLEL_MIN_BYTES:
+                scan = self.scan_parallel(start, total_bytes)
+            else:
+                scan = self.scan_serial(start)
+            indexed_size = start
+            try:
+                for entries, indexed_size in scan:
+                    if self.cancelled.is_set():
+                        break
+                    batch.extend(entries)
+                    new_entries.extend(entries)
+                    count += len(entries)
+
+                    now = time.monotonic()
+                    if batch and (len(batch) >= self.BATCH_SIZE or now - last_emit >= self.BATCH_INTERVAL):
+                        self.games_loaded.emit(batch)
+                        batch = []
+                        last_emit = now
+
+                        if total_bytes > 0:
+                            progress = min(int(indexed_size * 100 / total_bytes), 99)
+                            if progress != last_progress:
+                                self.progress.emit(progress)
+                                last_progress = progress
+            finally:
+                scan.close()
+
+            if batch:
+                self.games_loaded.emit(batch)
+            if not self.cancelled.is_set():
+                if state != "full":
+                    self.write_index(new_entries, state == "tail", indexed_size, stat.st_mtime_ns)
+                self.progress.emit(100)
+            self.loading_finished.emit(count, self.cancelled.is_set())
+
         except Exception as e:
             self.error.emit(f"Грешка при зареждане на PGN: {str(e)}")
 
+    def scan_serial(self, start):
+        """([запис], позиция след него) за всяка партия"""
+        with open(self.file_path, 'rb') as f:
+            f.seek(start)
+            for entry in iter_pgn_index(f, count_moves=self.count_moves):
+                yield [entry], f.tell()
+            yield [], f.tell()
+
+    def scan_parallel(self, start, size):
+        """(записите от парчето, край на парчето) по реда във файла"""
+        low, high = self.CHUNK_BYTES
+        chunk_size = min(max((size - start) // (self.processes * 4), low), high)
+        with open(self.file_path, 'rb') as f:
+            bounds = pgn_chunk_boundaries(f, start, size, chunk_size)
+        # spawn: fork от процес с работещи Qt нишки не е безопасен
+        with ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(index_pgn_chunk, self.file_path, chunk_start, chunk_end, self.count_moves)
+                       for chunk_start, chunk_end in zip(bounds, bounds[1:])]
+            try:
+                for future, chunk_end in zip(futures, bounds[1:]):
+                    yield future.result(), chunk_end
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def write_index(self, new_entries, append, indexed_size, mtime_ns):
+        """Записва .idx (стария индекс + новите записи при append) и подава временния файл на GUI-то"""
+        previous = PGNSidecarIndex.open(self.file_path) if append else None
+        entries = itertools.chain(previous if previous is not None else (), new_entries)
+        try:
+            tmp_path = PGNSidecarIndex.write(self.file_path, entries, indexed_size, mtime_ns)
+        except (OSError, struct.error) as e:
+            print(f"Индексът не е записан: {e}")
+            return
+        finally:
+            if previous is not None:
+                previous.close()
+        self.index_written.emit(tmp_path)
+
 
 class VerticalEvalBar(QWidget):
     def __init__(self, parent=None):
@@ -1752,6 +3478,7 @@ class BoardWidget(QWidget):
         self.last_move = None
         self.legal_moves_for_selected = []
         self.best_engine_move = None
+        self.engine_arrows = []
         self.flipped = False
         self.show_engine_arrows = True
         self.setFixedSize(BOARD_SIZE, BOARD_SIZE)
@@ -1904,28 +3631,33 @@ class BoardWidget(QWidget):
                         qp.drawText(col + SQ//2 - 10, row + SQ//2 + 10, "♔" if p.color == chess.WHITE else "♚")
 
         if self.best_engine_move and self.show_engine_arrows:
-            from_sq = self.best_engine_move.from_square
-            to_sq = self.best_engine_move.to_square
-            f1, r1 = chess.square_file(from_sq), 7 - chess.square_rank(from_sq)
-            f2, r2 = chess.square_file(to_sq), 7 - chess.square_rank(to_sq)
-            
-            if self.flipped:
-                f1, r1 = 7-f1, 7-r1
-                f2, r2 = 7-f2, 7-r2
+            # MultiPV кандидатите се рисуват по-бледо, а най-добрият ход - най-отгоре
+            arrows = [(move, QColor(0, 160, 255, 110), SQ//9) for move in self.engine_arrows
+                      if move != self.best_engine_move]
+            arrows.append((self.best_engine_move, QColor(0, 255, 0, 200), SQ//6))
+            
+            for move, col, width in arrows:
+                from_sq = move.from_square
+                to_sq = move.to_square
+                f1, r1 = chess.square_file(from_sq), 7 - chess.square_rank(from_sq)
+                f2, r2 = chess.square_file(to_sq), 7 - chess.square_rank(to_sq)
                 
-            x1, y1 = f1*SQ + SQ//2, r1*SQ + SQ//2
-            x2, y2 = f2*SQ + SQ//2, r2*SQ + SQ//2
-            
-            col = QColor(0, 255, 0, 200)
-            pen = QPen(col, SQ//6)
-            pen.setCapStyle(Qt.RoundCap)
-            qp.setPen(pen)
-            qp.drawLine(x1, y1, x2, y2)
-            
-            qp.setBrush(col)
-            qp.setPen(Qt.NoPen)
-            head_size = SQ//3
-            qp.drawEllipse(x2 - head_size//2, y2 - head_size//2, head_size, head_size)
+                if self.flipped:
+                    f1, r1 = 7-f1, 7-r1
+                    f2, r2 = 7-f2, 7-r2
+                    
+                x1, y1 = f1*SQ + SQ//2, r1*SQ + SQ//2
+                x2, y2 = f2*SQ + SQ//2, r2*SQ + SQ//2
+                
+                pen = QPen(col, width)
+                pen.setCapStyle(Qt.RoundCap)
+                qp.setPen(pen)
+                qp.drawLine(x1, y1, x2, y2)
+                
+                qp.setBrush(col)
+                qp.setPen(Qt.NoPen)
+                head_size = width * 2
+                qp.drawEllipse(x2 - head_size//2, y2 - head_size//2, head_size, head_size)
 
         for sq in chess.SQUARES:
             piece = self.app.current_board.piece_at(sq)
@@ -2152,6 +3884,7 @@ class SimpleGameChartWidget(QWidget):
         self.main_app = main_app
         self.eval_history = []
         self.move_history = []
+        self.ply_offset = 0  # полуходове, изрязани от началото на историята
         self.hover_index = -1
         self.setMinimumHeight(100)
         self.setMouseTracking(True)
@@ -2161,6 +3894,7 @@ class SimpleGameChartWidget(QWidget):
         """Изчиства графиката"""
         self.eval_history = []
         self.move_history = []
+        self.ply_offset = 0
         self.hover_index = -1
         self.update()
         
@@ -2175,9 +3909,17 @@ class SimpleGameChartWidget(QWidget):
         self.eval_history.append(eval_cp)
         self.move_history.append(f"{display_number}. {move_notation}")
         if len(self.eval_history) > 80: 
+            self.ply_offset += len(self.eval_history) - 80
             self.eval_history = self.eval_history[-80:]
             self.move_history = self.move_history[-80:]
         self.update()
+
+    def set_eval(self, ply, eval_cp):
+        """Заменя оценката след даден полуход (0-базиран); резултатите идват в произволен ред"""
+        index = ply - self.ply_offset
+        if 0 <= index < len(self.eval_history):
+            self.eval_history[index] = eval_cp
+            self.update()
         
     def mouseMoveEvent(self, event):
         """Обработка на движение на мишката за tooltip"""
@@ -2671,20 +4413,54 @@ class Settings:
             "engine2_path": "",
             "engine1_threads": 1,
             "engine2_threads": 1,
+            "analysis_engine_path": "",
+            "analysis_threads": 1,
+            "analysis_hash": 64,
+            "engine_options": {},  # UCI опции по двигател (ключ е пътят до изпълнимия файл)
             "book_path": "",
             "book_max_depth": 10,
             "pieces_folder": "",
             "time_control": 300,
             "increment": 0,
+            "moves_per_session": 0,
             "player_color": "white",
             "game_mode": "human_vs_engine",
             "engine_strength": "time_based",
+            "engine2_strength": "",
+            "custom_search_limit": {"depth": 18, "time": 3.0},
             "light_square_color": "#f0d9b5",
             "dark_square_color": "#b58863",
             "pv_moves_display": 12,
             "theme": "dark_blue",
             "language": "bg",
-            "show_engine_arrows": True
+            "show_engine_arrows": True,
+            "analysis_update_hz": 30,
+            "multipv_lines": 1,
+            "ponder": True,
+            "engine_ping_interval": 5,
+            "eval_cache_size": 50000,
+            "eval_cache_db": "",
+            "eval_cache_min_depth": 10,
+            "analysis_target_depth": 0,
+            "game_eval_engines": 2,
+            "game_eval_nodes": 200000,
+            "game_eval_time": 0.0,
+            "adjudicate_resign_score": 1000,
+            "adjudicate_resign_moves": 5,
+            "adjudicate_draw_score": 10,
+            "adjudicate_draw_moves": 10,
+            "adjudicate_draw_move_number": 40,
+            "adjudicate_tb_pieces": 6,
+            "syzygy_path": "",
+            "syzygy_cache_size": 100000,
+            "opening_suite_path": "",
+            "opening_suite_order": "sequential",
+            "opening_suite_cursor": 0,
+            "fast_engine_mode": False,
+            "fast_gui_refresh_ms": 500,
+            "pgn_loader_processes": 0,
+            "pgn_index_move_counts": False,
+            "engine_response_timeout": 60
         }
         self.current = {}
         self.load()
@@ -2716,6 +4492,23 @@ class Settings:
         self.current[key] = value
         self.save()
 
+    @staticmethod
+    def engine_key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def engine_options(self, path):
+        """Запазените UCI опции на двигателя с даден път"""
+        if not path:
+            return {}
+        return dict((self.get("engine_options", {}) or {}).get(self.engine_key(path), {}))
+
+    def set_engine_option(self, path, name, value):
+        profiles = dict(self.get("engine_options", {}) or {})
+        profile = dict(profiles.get(self.engine_key(path), {}))
+        profile[name] = value
+        profiles[self.engine_key(path)] = profile
+        self.set("engine_options", profiles)
+
 
 class BookDisplayDialog(QDialog):
     def __init__(self, parent, entries, total_weight):
@@ -2760,6 +4553,110 @@ class BookDisplayDialog(QDialog):
         layout.addWidget(btn_close)
 
 
+class EngineOptionsDialog(QDialog):
+    """Панел с UCI опциите, обявени от двигателя; промените се прилагат на живо"""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.app = parent
+        self.language = parent.language
+        self.setWindowTitle("Опции на двигателя" if self.language == "bg" else "Engine Options")
+        self.resize(520, 600)
+        self.editors = {}
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        
+        self.slot_combo = QComboBox()
+        for label_bg, label_en, eng_num in (("Двигател 1", "Engine 1", 1),
+                                            ("Двигател 2", "Engine 2", 2),
+                                            ("Двигател за анализ", "Analysis Engine", "analysis")):
+            if getattr(self.app, self.app.ENGINE_SLOTS[eng_num][0]):
+                self.slot_combo.addItem(label_bg if self.language == "bg" else label_en, eng_num)
+        self.slot_combo.currentIndexChanged.connect(self.build_form)
+        layout.addWidget(self.slot_combo)
+        
+        self.scroll = QScrollArea()
+        self.scroll.setWidgetResizable(True)
+        layout.addWidget(self.scroll)
+        
+        btns = QDialogButtonBox(QDialogButtonBox.Apply | QDialogButtonBox.Close)
+        btns.button(QDialogButtonBox.Apply).clicked.connect(self.apply_changes)
+        btns.rejected.connect(self.reject)
+        layout.addWidget(btns)
+        
+        self.build_form()
+
+    def build_form(self):
+        form_widget = QWidget()
+        form = QFormLayout(form_widget)
+        self.editors = {}
+        eng_num = self.slot_combo.currentData()
+        engine = getattr(self.app, self.app.ENGINE_SLOTS[eng_num][0]) if eng_num is not None else None
+        if engine is None:
+            form.addRow(QLabel("Няма зареден двигател" if self.language == "bg" else "No engine loaded"))
+            self.scroll.setWidget(form_widget)
+            return
+        
+        current = self.app.engine_option_values(eng_num)
+        for option in engine.options.values():
+            if option.is_managed():
+                continue
+            value = current.get(option.name, option.default)
+            if option.type == "spin":
+                editor = QSpinBox()
+                editor.setRange(option.min if option.min is not None else -2**31, option.max if option.max is not None else 2**31 - 1)
+                # Някои енджини не дават стойност по подразбиране за spin опции
+                try:
+                    editor.setValue(int(value))
+                except (TypeError, ValueError):
+                    editor.setValue(option.min if option.min is not None else 0)
+            elif option.type == "check":
+                editor = QCheckBox()
+                editor.setChecked(bool(value))
+            elif option.type == "combo":
+                editor = QComboBox()
+                editor.addItems(option.var)
+                editor.setCurrentText(str(value))
+            elif option.type == "button":
+                editor = QPushButton(option.name)
+                editor.clicked.connect(lambda _, n=option.name: self.set_option(eng_num, n, None))
+                form.addRow(editor)
+                continue
+            else:
+                value = "" if value in (None, "<empty>") else str(value)
+                editor = QLineEdit(value)
+            # Сравнява се с началното състояние на редактора, а не със стойността по подразбиране
+            self.editors[option.name] = (editor, self.editor_value(editor))
+            form.addRow(option.name + ":", editor)
+        self.scroll.setWidget(form_widget)
+
+    def editor_value(self, editor):
+        if isinstance(editor, QSpinBox):
+            return editor.value()
+        if isinstance(editor, QCheckBox):
+            return editor.isChecked()
+        if isinstance(editor, QComboBox):
+            return editor.currentText()
+        return editor.text()
+
+    def set_option(self, eng_num, name, value):
+        try:
+            return self.app.set_engine_option(eng_num, name, value)
+        except ValueError as e:
+            QMessageBox.warning(self, "Грешка" if self.language == "bg" else "Error", f"{name}: {e}")
+            return None
+
+    def apply_changes(self):
+        eng_num = self.slot_combo.currentData()
+        for name, (editor, initial) in self.editors.items():
+            value = self.editor_value(editor)
+            if value != initial:
+                self.set_option(eng_num, name, value)
+        self.build_form()
+
+
 class ColorPaletteDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -2900,15 +4797,79 @@ class ColorPaletteDialog(QDialog):
         self.parent().board_w.update()
         self.accept()
 
+class PGNGamesModel(QAbstractTableModel):
+    """Списъкът с партии върху PGNDatabase: клетките се изчисляват само за показаните редове"""
+
+    # (заглавие, стойност по подразбиране) за колоните след номера
+    HEADER_COLUMNS = {1: ("Event", "N/A"), 2: ("White", "N/A"), 3: ("Black", "N/A"),
+                      4: ("Result", "*"), 5: ("Date", "????.??.??")}
+    MOVES_COLUMN = 6
+    OPENING_COLUMN = 7
+
+    def __init__(self, database, headers, parent=None):
+        super().__init__(parent)
+        self.database = database
+        self.headers = headers
+        self.rows = len(database)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role == Qt.TextAlignmentRole and column in (0, self.MOVES_COLUMN):
+            return Qt.AlignCenter
+        if role != Qt.DisplayRole:
+            return None
+        if column == 0:
+            return str(row + 1)
+        if column == self.MOVES_COLUMN:
+            return str(self.database.move_count(row))
+        headers = self.database.headers(row)
+        if column == self.OPENING_COLUMN:
+            return " ".join(value for value in (headers.get("ECO", ""), headers.get("Opening", "")) if value)
+        name, default = self.HEADER_COLUMNS[column]
+        return headers.get(name, default)
+
+    def set_database(self, database):
+        self.beginResetModel()
+        self.database = database
+        self.rows = len(database)
+        self.endResetModel()
+
+    def games_added(self, start):
+        """Новите партии от поточното зареждане: редовете от start до края на базата"""
+        count = len(self.database)
+        if count > start:
+            self.beginInsertRows(QModelIndex(), start, count - 1)
+            self.rows = count
+            self.endInsertRows()
+
+    def row_changed(self, row):
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+
 class PGNGameDialog(QDialog):
     """Диалогов прозорец за избор на партия от PGN база"""
+
+    WIDTH_SAMPLE_ROWS = 200  # ширината на колоните се мери по толкова реда
     
     load_game = pyqtSignal(int)  # Сигнал за зареждане на игра
     
     def __init__(self, parent=None, pgn_games=None):
         super().__init__(parent)
         self.main_app = parent
-        self.pgn_games = pgn_games or []
+        self.pgn_games = pgn_games if pgn_games is not None else PGNDatabase()
         self.selected_game_index = -1
         self.setWindowTitle("Избор на партия от PGN" if parent.language == "bg" else "Select Game from PGN")
         self.resize(900, 600)
@@ -2925,8 +4886,6 @@ class PGNGameDialog(QDialog):
         layout.addWidget(title_label)
         
         # Таблица с партиите
-        self.games_table = QTableWidget()
-        self.games_table.setColumnCount(8)
         headers = ["№", "Събитие" if self.main_app.language == "bg" else "Event", 
                   "Бели" if self.main_app.language == "bg" else "White",
                   "Черни" if self.main_app.language == "bg" else "Black",
@@ -2934,7 +4893,9 @@ class PGNGameDialog(QDialog):
                   "Дата" if self.main_app.language == "bg" else "Date",
                   "Ходове" if self.main_app.language == "bg" else "Moves",
                   "Отваряне" if self.main_app.language == "bg" else "Opening"]
-        self.games_table.setHorizontalHeaderLabels(headers)
+        self.games_model = PGNGamesModel(self.pgn_games, headers, self)
+        self.games_table = QTableView()
+        self.games_table.setModel(self.games_model)
         self.games_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.games_table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.games_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
@@ -2943,7 +4904,9 @@ class PGNGameDialog(QDialog):
         
         # Настройване на таблицата
         self.games_table.horizontalHeader().setStretchLastSection(True)
+        self.games_table.horizontalHeader().setResizeContentsPrecision(self.WIDTH_SAMPLE_ROWS)
         self.games_table.verticalHeader().setVisible(False)
+        self.games_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.games_table.setAlternatingRowColors(True)
         
         layout.addWidget(self.games_table)
@@ -3007,64 +4970,23 @@ class PGNGameDialog(QDialog):
         
     def load_games(self):
         """Зарежда всички партии в таблицата"""
-        self.games_table.setRowCount(len(self.pgn_games))
-        
-        for i, game in enumerate(self.pgn_games):
-            # Номер
-            num_item = QTableWidgetItem(str(i + 1))
-            num_item.setTextAlignment(Qt.AlignCenter)
-            self.games_table.setItem(i, 0, num_item)
-            
-            # Събитие
-            event = game.headers.get("Event", "N/A")
-            self.games_table.setItem(i, 1, QTableWidgetItem(event))
-            
-            # Бели
-            white = game.headers.get("White", "N/A")
-            self.games_table.setItem(i, 2, QTableWidgetItem(white))
-            
-            # Черни
-            black = game.headers.get("Black", "N/A")
-            self.games_table.setItem(i, 3, QTableWidgetItem(black))
-            
-            # Резултат
-            result = game.headers.get("Result", "*")
-            self.games_table.setItem(i, 4, QTableWidgetItem(result))
-            
-            # Дата
-            date = game.headers.get("Date", "????.??.??")
-            self.games_table.setItem(i, 5, QTableWidgetItem(date))
-            
-            # Брой ходове
-            moves_count = len(list(game.mainline_moves()))
-            moves_item = QTableWidgetItem(str(moves_count))
-            moves_item.setTextAlignment(Qt.AlignCenter)
-            self.games_table.setItem(i, 6, moves_item)
-            
-            # Отваряне
-            opening = game.headers.get("Opening", "")
-            eco = game.headers.get("ECO", "")
-            if opening and eco:
-                opening_text = f"{eco} {opening}"
-            elif opening:
-                opening_text = opening
-            elif eco:
-                opening_text = eco
-            else:
-                opening_text = ""
-            self.games_table.setItem(i, 7, QTableWidgetItem(opening_text))
-        
-        # Автоматично настройване на ширината на колоните
+        self.games_model.set_database(self.pgn_games)
+
+        # Ширината на колоните се мери по първите редове, а не по цялата база
         self.games_table.resizeColumnsToContents()
         
         # Избираме първата партия по подразбиране
         if self.pgn_games:
             self.games_table.selectRow(0)
             self.update_preview()
+
+    def append_games(self, start):
+        """Показва партиите от индекс start нататък (при поточно зареждане)"""
+        self.games_model.games_added(start)
     
     def update_preview(self):
         """Обновява прегледа за текущо избраната партия"""
-        selected_rows = self.games_table.selectedItems()
+        selected_rows = self.games_table.selectionModel().selectedRows()
         if not selected_rows:
             return
             
@@ -3074,6 +4996,8 @@ class PGNGameDialog(QDialog):
             
         game = self.pgn_games[row]
         self.selected_game_index = row
+        # След парсването броят ходове е точен
+        self.games_model.row_changed(row)
         
         # Обновяваме детайлите
         details = self.get_game_details(game)
@@ -3204,12 +5128,16 @@ class PGNGameDialog(QDialog):
 
 class ProgressDialog(QDialog):
     """Диалог за прогрес при зареждане на PGN"""
+
+    cancelled = pyqtSignal()
     
-    def __init__(self, parent=None, title="Зареждане..."):
+    def __init__(self, parent=None, title="Зареждане...", cancellable=False):
         super().__init__(parent)
+        self.cancellable = cancellable
+        self.language = getattr(parent, "language", "bg")
         self.setWindowTitle(title)
-        self.setFixedSize(400, 150)
-        self.setModal(True)
+        self.setFixedSize(400, 180 if cancellable else 150)
+        self.setModal(not cancellable)
         self.setWindowFlags(Qt.Dialog | Qt.FramelessWindowHint)
         self.init_ui()
         
@@ -3229,6 +5157,22 @@ class ProgressDialog(QDialog):
         self.details_label = QLabel("")
         self.details_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.details_label)
+
+        if self.cancellable:
+            self.cancel_button = QPushButton("Отказ" if self.language == "bg" else "Cancel")
+            self.cancel_button.clicked.connect(self.cancel)
+            layout.addWidget(self.cancel_button, alignment=Qt.AlignCenter)
+
+    def cancel(self):
+        self.cancel_button.setEnabled(False)
+        self.cancelled.emit()
+
+    def reject(self):
+        # Esc прекъсва зареждането вместо само да скрие диалога
+        if self.cancellable:
+            self.cancel()
+        else:
+            super().reject()
         
     def set_progress(self, value, text=None):
         self.progress_bar.setValue(value)
@@ -3252,10 +5196,51 @@ class App(QMainWindow):
         
         self.engine = None
         self.engine2 = None
+        # Отделен процес само за панела с анализа (пул: 1, 2, "analysis")
+        self.analysis_engine = None
         self.is_engine_vs_engine = self.settings.get("game_mode", "human_vs_engine") == "engine_vs_engine"
         self.book = None
-        self.analysis_thread = None
-        self.game_thread = None
+        # Дълготрайни worker-и за процесите на двигателите и текущите им команди
+        self.engine_worker = None
+        self.engine2_worker = None
+        self.analysis_engine_worker = None
+        self.retired_workers = []
+        self.game_evaluator = None
+        self.analysis_worker = None
+        self.analysis_token = None
+        self.game_worker = None
+        self.game_token = None
+        # Ponder търсене в очакваната позиция (FEN след предсказания ход на човека)
+        self.ponder_worker = None
+        self.ponder_token = None
+        self.ponder_fen = None
+        # Управление на времето и измерване на забавянето между заявка и bestmove
+        self.time_manager = TimeManager()
+        # Кеш на оценките; позицията на текущия анализ и дълбочината на кеширания запис за нея
+        self.eval_cache = EvalCache(self.settings.get("eval_cache_size", 50000),
+                                    self.settings.get("eval_cache_db", "") or None)
+        self.analysis_board = None
+        self.analysis_cached_depth = 0
+        self.search_started = None
+        self.search_engine_time = None
+        # Оценка от търсенето за текущия ход (за присъждане на резултат в двигател срещу двигател)
+        self.search_score = None
+        self.tablebase = TablebaseProber(self.settings.get("syzygy_path", ""), self.settings.get("syzygy_cache_size", 100000))
+        self.adjudicator = Adjudicator.from_settings(self.settings, self.tablebase)
+        # Набор от дебюти за двигател срещу двигател; при разменени цветове двигател 2 играе с белите
+        self.opening_suite = None
+        self.colors_swapped = False
+        self.load_opening_suite(self.settings.get("opening_suite_path", ""))
+        # Идентичност на текущата партия (нов обект -> ucinewgame) и с какво е пуснат всеки двигател
+        self.engine_game = object()
+        self.engine_spawn_config = {}
+        # Супервизор: слотове в процес на рестарт и фоновите им тредове;
+        # spawn_threads пази тредовете до сигнала finished (и след като резултатът е обработен)
+        self.restarting_slots = {}
+        self.spawn_threads = {}
+        self.last_engine_ping = {}
+        # Позицията, в която търсенето на ход в играта вече се е провалило веднъж
+        self.failed_search_fen = None
         
         self.human_turn = False
         self.engine_thinking = False
@@ -3280,9 +5265,11 @@ class App(QMainWindow):
         
         # PGN променливи
         self.pgn_file_path = None
-        self.pgn_games = []
+        self.pgn_games = PGNDatabase()
         self.current_pgn_index = 0
         self.pgn_file_handle = None
+        self.pgn_loader_thread = None
+        self.pgn_streamed_games = 0
         
         # Променлива за проследяване на отворения PGN диалог
         self.pgn_dialog = None
@@ -3300,7 +5287,10 @@ class App(QMainWindow):
         self.highlights_widget = HighlightsWidget(self)
         
         self.move_evaluations = {}
+        self.game_evaluation_moves = []  # линията, към която се отнасят move_evaluations
         self.last_eval = 0
+        self.last_pv_key = None
+        self.pv_line_cache = {}
         self.current_move_number = 0
         self.full_game_stack = []
         self.redo_stack = []
@@ -3311,6 +5301,20 @@ class App(QMainWindow):
         
         self.load_saved_settings()
         
+        self.engine_supervisor = QTimer(self)
+        self.engine_supervisor.timeout.connect(self.supervise_engines)
+        self.engine_supervisor.start(1000)
+        
+        # Бърз режим: ходовете и info от търсенето се натрупват в паметта,
+        # GUI-то се опреснява на интервал или при поискване
+        self.gui_dirty = False
+        self.pending_move_items = []
+        self.pending_search_info = None
+        self.gui_refresh_timer = QTimer(self)
+        self.gui_refresh_timer.timeout.connect(self.flush_gui)
+        if self.settings.get("fast_gui_refresh_ms", 500) > 0:
+            self.gui_refresh_timer.start(self.settings.get("fast_gui_refresh_ms", 500))
+        
         self.console = ConsoleWidget(self)
         self.console.hide()
         
@@ -3361,23 +5365,8 @@ class App(QMainWindow):
             self.dark_square_color = QColor(181, 136, 99)
 
     def load_saved_settings(self):
-        self.close_engines()
-        
-        engine1_path = self.settings.get("engine1_path", "")
-        if engine1_path and os.path.exists(engine1_path) and HAS_ENGINE:
-            try:
-                self.engine = chess.engine.SimpleEngine.popen_uci(engine1_path)
-                self.engine.configure({"Threads": self.eng1_threads})
-            except Exception:
-                self.engine = None
-                
-        engine2_path = self.settings.get("engine2_path", "")
-        if engine2_path and os.path.exists(engine2_path) and HAS_ENGINE:
-            try:
-                self.engine2 = chess.engine.SimpleEngine.popen_uci(engine2_path)
-                self.engine2.configure({"Threads": self.eng2_threads})
-            except Exception:
-                self.engine2 = None
+        for eng_num in self.ENGINE_SLOTS:
+            self.ensure_engine(eng_num)
         
         book_path = self.settings.get("book_path", "")
         if book_path and os.path.exists(book_path) and HAS_POLYGLOT:
@@ -3473,6 +5462,63 @@ class App(QMainWindow):
         set_e2_thr = QAction("Задай нишки за двигател 2 (1-2)" if self.language == "bg" else "Set Engine 2 Threads (1-2)", self)
         set_e2_thr.triggered.connect(lambda: self.set_threads_dialog(2))
         engine_menu.addAction(set_e2_thr)
+        
+        engine_menu.addSeparator()
+        
+        load_ea = QAction("Зареди двигател за анализ" if self.language == "bg" else "Load Analysis Engine", self)
+        load_ea.triggered.connect(self.load_analysis_engine)
+        engine_menu.addAction(load_ea)
+        
+        set_ea = QAction("Нишки и Hash за анализа" if self.language == "bg" else "Analysis Engine Threads && Hash", self)
+        set_ea.triggered.connect(self.set_analysis_engine_dialog)
+        engine_menu.addAction(set_ea)
+        
+        set_mpv = QAction("Брой линии в анализа (MultiPV)" if self.language == "bg" else "Analysis Lines (MultiPV)", self)
+        set_mpv.triggered.connect(self.set_multipv_dialog)
+        engine_menu.addAction(set_mpv)
+        
+        options_action = QAction("Опции на двигателя..." if self.language == "bg" else "Engine Options...", self)
+        options_action.triggered.connect(lambda: EngineOptionsDialog(self).exec_())
+        engine_menu.addAction(options_action)
+        
+        ponder_action = QAction("Мислене по време на хода на човека (Ponder)" if self.language == "bg" else "Think on Opponent's Time (Ponder)", self)
+        ponder_action.setCheckable(True)
+        ponder_action.setChecked(self.settings.get("ponder", True))
+        ponder_action.toggled.connect(self.toggle_ponder)
+        engine_menu.addAction(ponder_action)
+        
+        syzygy_action = QAction("Syzygy таблици..." if self.language == "bg" else "Syzygy Tablebases...", self)
+        syzygy_action.triggered.connect(self.set_syzygy_path_dialog)
+        engine_menu.addAction(syzygy_action)
+        
+        engine_menu.addSeparator()
+        
+        suite_action = QAction("Набор от дебюти (EPD/PGN)..." if self.language == "bg" else "Opening Suite (EPD/PGN)...", self)
+        suite_action.triggered.connect(self.load_opening_suite_dialog)
+        engine_menu.addAction(suite_action)
+        
+        suite_random_action = QAction("Случаен ред на дебютите" if self.language == "bg" else "Random Opening Order", self)
+        suite_random_action.setCheckable(True)
+        suite_random_action.setChecked(self.settings.get("opening_suite_order", "sequential") == "random")
+        suite_random_action.toggled.connect(self.toggle_opening_suite_random)
+        engine_menu.addAction(suite_random_action)
+        
+        suite_clear_action = QAction("Без набор от дебюти" if self.language == "bg" else "No Opening Suite", self)
+        suite_clear_action.triggered.connect(self.clear_opening_suite)
+        engine_menu.addAction(suite_clear_action)
+        
+        engine_menu.addSeparator()
+        
+        fast_action = QAction("Бърз режим (двигател срещу двигател)" if self.language == "bg" else "Fast Mode (Engine vs Engine)", self)
+        fast_action.setCheckable(True)
+        fast_action.setChecked(self.settings.get("fast_engine_mode", False))
+        fast_action.toggled.connect(self.toggle_fast_mode)
+        engine_menu.addAction(fast_action)
+        
+        refresh_action = QAction("Опресни дъската сега" if self.language == "bg" else "Refresh Board Now", self)
+        refresh_action.setShortcut("F5")
+        refresh_action.triggered.connect(self.flush_gui)
+        engine_menu.addAction(refresh_action)
 
         board_menu = menubar.addMenu("Дъска" if self.language == "bg" else "Board")
         
@@ -3733,19 +5779,116 @@ class App(QMainWindow):
             if eng_num == 1:
                 self.eng1_threads = val
                 self.settings.set("engine1_threads", val)
-                if self.engine:
-                    try: 
-                        self.engine.configure({"Threads": val})
-                    except: 
-                        pass
             else:
                 self.eng2_threads = val
                 self.settings.set("engine2_threads", val)
-                if self.engine2:
-                    try: 
-                        self.engine2.configure({"Threads": val})
-                    except: 
-                        pass
+            engine = self.engine if eng_num == 1 else self.engine2
+            if engine and "Threads" in engine.options:
+                try:
+                    self.set_engine_option(eng_num, "Threads", val)
+                except ValueError as e:
+                    QMessageBox.warning(self, "Грешка" if self.language == "bg" else "Error", str(e))
+
+    def set_analysis_engine_dialog(self):
+        """Нишки и Hash на отделния двигател за анализ"""
+        threads, ok = QInputDialog.getInt(self,
+                                          "Двигател за анализ" if self.language == "bg" else "Analysis Engine",
+                                          "Брой нишки:" if self.language == "bg" else "Number of Threads:",
+                                          self.settings.get("analysis_threads", 1), 1, 512)
+        if not ok:
+            return
+        hash_mb, ok = QInputDialog.getInt(self,
+                                          "Двигател за анализ" if self.language == "bg" else "Analysis Engine",
+                                          "Hash (MB):",
+                                          self.settings.get("analysis_hash", 64), 1, 65536)
+        if not ok:
+            return
+        self.settings.set("analysis_threads", threads)
+        self.settings.set("analysis_hash", hash_mb)
+        self.ensure_engine("analysis")
+
+    def update_tablebase_info(self):
+        """Резултат от таблиците за текущата позиция в панела за анализ"""
+        probe = self.tablebase.probe(self.current_board)
+        if probe is None:
+            self.tablebase_label.hide()
+            return
+        wdl, dtz = probe
+        if self.language == "bg":
+            outcome = {2: "Печели", 1: "Печели (след 50 хода реми)", 0: "Реми",
+                       -1: "Губи (след 50 хода реми)", -2: "Губи"}[wdl]
+            side = "белите" if self.current_board.turn == chess.WHITE else "черните"
+            text = f"Таблици: {outcome} за {side}"
+        else:
+            outcome = {2: "Win", 1: "Cursed win", 0: "Draw", -1: "Blessed loss", -2: "Loss"}[wdl]
+            side = "White" if self.current_board.turn == chess.WHITE else "Black"
+            text = f"Tablebase: {outcome} for {side}"
+        if dtz is not None and wdl != 0:
+            text += f" (DTZ {abs(dtz)})"
+        self.tablebase_label.setText(text)
+        self.tablebase_label.show()
+
+    def reload_adjudicator(self):
+        """Нови правила за присъждане; натрупаните оценки на текущата партия се запазват"""
+        scores = self.adjudicator.scores
+        self.adjudicator.close()
+        self.adjudicator = Adjudicator.from_settings(self.settings, self.tablebase)
+        self.adjudicator.scores = scores
+
+    def set_syzygy_path_dialog(self):
+        path = QFileDialog.getExistingDirectory(self, "Syzygy таблици" if self.language == "bg" else "Syzygy Tablebases",
+                                                self.settings.get("syzygy_path", "").split(os.pathsep)[0])
+        if path:
+            self.settings.set("syzygy_path", path)
+            self.tablebase.close()
+            self.tablebase = TablebaseProber(path, self.settings.get("syzygy_cache_size", 100000))
+            self.reload_adjudicator()
+            # SyzygyPath се подава на живо на заредените двигатели
+            for eng_num in self.ENGINE_SLOTS:
+                if getattr(self, self.ENGINE_SLOTS[eng_num][0]) is not None:
+                    self.ensure_engine(eng_num)
+            self.update_tablebase_info()
+
+    def fast_mode_active(self):
+        return self.is_engine_vs_engine and self.settings.get("fast_engine_mode", False)
+
+    def toggle_fast_mode(self, enabled):
+        self.settings.set("fast_engine_mode", enabled)
+        if not enabled:
+            self.flush_gui()
+
+    def flush_gui(self):
+        """Показва натрупаното в бърз режим: ходове в таблицата, дъска, FEN, подсветки, кой е на ход
+        и последното info от търсенето"""
+        if not self.gui_dirty:
+            return
+        self.gui_dirty = False
+        pending, self.pending_move_items = self.pending_move_items, []
+        for ply, san in pending:
+            self.append_move_item(ply, san)
+        info, self.pending_search_info = self.pending_search_info, None
+        if info is not None:
+            self.update_analysis(info)
+        self.board_w.update()
+        self.fen_label.setText(self.current_board.fen())
+        self.highlights_widget.update_highlights(self.current_board)
+        self.update_turn_display()
+
+    def toggle_ponder(self, enabled):
+        self.settings.set("ponder", enabled)
+        if not enabled:
+            self.stop_ponder()
+
+    def set_multipv_dialog(self):
+        val, ok = QInputDialog.getInt(self,
+                                      "MultiPV",
+                                      "Брой линии в анализа (1-10):" if self.language == "bg" else "Number of analysis lines (1-10):",
+                                      self.settings.get("multipv_lines", 1), 1, 10)
+        if ok:
+            self.settings.set("multipv_lines", val)
+            if self.analysis_token is not None:
+                self.stop_analysis()
+                self.start_analysis()
 
     def flip_board(self):
         """ВАЖНА КОРЕКЦИЯ: Обръща дъската и ресетва селекцията"""
@@ -4103,41 +6246,194 @@ PyChess Pro+ v1.0
             else:
                 self.fen_label.setStyleSheet("padding: 3px; background: #f0f0f0; color: #000000; border: 1px solid #ccc; border-radius: 3px;")
 
+    ENGINE_SLOTS = {
+        1: ("engine", "engine_worker"),
+        2: ("engine2", "engine2_worker"),
+        "analysis": ("analysis_engine", "analysis_engine_worker"),
+    }
+
+    # Опции с отделни настройки на слота (диалози за нишки/Hash); всичко останало е в профила
+    # на двигателя, така че друг двигател в същия слот не наследява чужди опции
+    ENGINE_OPTION_SETTINGS = {
+        (1, "threads"): "engine1_threads",
+        (2, "threads"): "engine2_threads",
+        ("analysis", "threads"): "analysis_threads",
+        ("analysis", "hash"): "analysis_hash",
+    }
+
+    def engine_slot_config(self, eng_num):
+        """Път и UCI опции, с които трябва да работи двигателят в дадения слот"""
+        if eng_num == "analysis":
+            # Без собствен път анализът ползва отделен процес на двигател 1
+            path = self.settings.get("analysis_engine_path", "") or self.settings.get("engine1_path", "")
+            options = {"Threads": self.settings.get("analysis_threads", 1),
+                       "Hash": self.settings.get("analysis_hash", 64)}
+        else:
+            path = self.settings.get(f"engine{eng_num}_path", "")
+            options = {"Threads": self.eng1_threads if eng_num == 1 else self.eng2_threads}
+        if self.settings.get("syzygy_path", ""):
+            options["SyzygyPath"] = self.settings.get("syzygy_path", "")
+        options.update({name: value for name, value in self.settings.engine_options(path).items()
+                        if (eng_num, name.lower()) not in self.ENGINE_OPTION_SETTINGS})
+        return path, options
+
+    def engine_option_values(self, eng_num):
+        """Текущо зададените опции на двигателя в слота (без стойностите по подразбиране)"""
+        return dict(self.engine_spawn_config.get(eng_num, (None, {}))[1])
+
+    def set_engine_option(self, eng_num, name, value):
+        """Проверява стойността спрямо обявените от двигателя опции, запазва я в профила
+        на двигателя и я прилага на живо между търсенията. Връща проверената стойност."""
+        engine = getattr(self, self.ENGINE_SLOTS[eng_num][0])
+        if engine is None:
+            raise ValueError("Двигателят не е зареден" if self.language == "bg" else "Engine not loaded")
+        if name not in engine.options:
+            raise ValueError(f"Непозната опция: {name}" if self.language == "bg" else f"Unknown option: {name}")
+        option = engine.options[name]
+        if option.is_managed():
+            raise ValueError(f"Опцията {option.name} се управлява от програмата" if self.language == "bg"
+                             else f"Option {option.name} is managed by the application")
+        try:
+            value = option.parse(value)
+        except chess.engine.EngineError as e:
+            raise ValueError(str(e))
+        
+        # Анализ/ponder в същия процес не свършват сами, затова се спират и анализът се пуска отново
+        worker = getattr(self, self.ENGINE_SLOTS[eng_num][1])
+        resume_analysis = worker is not None and worker is self.analysis_worker and self.analysis_token is not None
+        if worker is not None and worker is self.ponder_worker:
+            self.stop_ponder()
+        if resume_analysis:
+            self.stop_analysis()
+        
+        if option.type == "button":
+            # Бутоните се изпълняват еднократно и не се запазват
+            self.get_engine_worker(engine).configure({option.name: None})
+        else:
+            setting_key = self.ENGINE_OPTION_SETTINGS.get((eng_num, option.name.lower()))
+            if setting_key:
+                self.settings.set(setting_key, value)
+                if setting_key == "engine1_threads":
+                    self.eng1_threads = value
+                elif setting_key == "engine2_threads":
+                    self.eng2_threads = value
+            else:
+                path = self.engine_spawn_config.get(eng_num, (None, {}))[0] or self.engine_slot_config(eng_num)[0]
+                self.settings.set_engine_option(path, option.name, value)
+            self.ensure_engine(eng_num)
+        
+        if resume_analysis:
+            self.start_analysis()
+        return value
+
     def close_engines(self):
         """Затваряне на всички двигатели и изчистване на паметта"""
-        if self.engine:
+        self.analysis_token = None
+        self.game_token = None
+        self.ponder_token = None
+        for eng_num in self.ENGINE_SLOTS:
+            self.close_engine(eng_num)
+        self.analysis_worker = None
+        self.game_worker = None
+
+    def close_engine(self, eng_num):
+        """Затваря един двигател; ако има worker, това става в неговата нишка"""
+        engine_attr, worker_attr = self.ENGINE_SLOTS[eng_num]
+        engine = getattr(self, engine_attr)
+        worker = getattr(self, worker_attr)
+        if worker:
+            if worker is self.analysis_worker:
+                self.analysis_token = None
+            if worker is self.game_worker:
+                self.game_token = None
+            if worker is self.ponder_worker:
+                self.ponder_token = None
+            self.retire_worker(worker)
+        elif engine:
             try:
-                self.engine.quit()
-                self.engine.close()
-                self.engine = None
+                engine.quit()
             except:
                 pass
-                self.engine = None
-        
-        if self.engine2:
-            try:
-                self.engine2.quit()
-                self.engine2.close()
-                self.engine2 = None
-            except:
-                pass
-                self.engine2 = None
-        
-        if self.analysis_thread and self.analysis_thread.isRunning():
-            self.analysis_thread.stop()
-            self.analysis_thread.wait(2000)
-            self.analysis_thread = None
-        
-        if self.game_thread and self.game_thread.isRunning():
-            self.game_thread.stop()
-            self.game_thread.wait(2000)
-            self.game_thread = None
+        setattr(self, engine_attr, None)
+        setattr(self, worker_attr, None)
+        self.engine_spawn_config.pop(eng_num, None)
+
+    def ensure_engine(self, eng_num, force=False, raise_errors=False):
+        """Осигурява работещ двигател според настройките.
+        Процесът се пуска наново само при смяна на пътя или ако е паднал."""
+        engine_attr = self.ENGINE_SLOTS[eng_num][0]
+        engine = getattr(self, engine_attr)
+        path, options = self.engine_slot_config(eng_num)
+        
+        alive = engine is not None and not engine.returncode.done()
+        spawn_path, applied = self.engine_spawn_config.get(eng_num, (None, {}))
+        if alive and not force and spawn_path == path:
+            # Опциите се сменят на живо, без нов процес
+            changed = {name: value for name, value in options.items()
+                       if name in engine.options and applied.get(name) != value}
+            if changed:
+                self.get_engine_worker(engine).configure(changed)
+                applied.update(changed)
+            return engine
+        
+        self.close_engine(eng_num)
+        if not (path and os.path.exists(path) and HAS_ENGINE):
+            return None
+        try:
+            engine = chess.engine.SimpleEngine.popen_uci(path)
+            options = {name: value for name, value in options.items() if name in engine.options}
+            engine.configure(options)
+        except Exception:
+            if raise_errors:
+                raise
+            return None
+        setattr(self, engine_attr, engine)
+        self.engine_spawn_config[eng_num] = (path, dict(options))
+        return engine
+
+    def get_engine_worker(self, engine):
+        """Връща (и при нужда създава) дълготрайния worker за даден двигател"""
+        if engine is None:
+            return None
+        worker_attr = next(worker_attr for engine_attr, worker_attr in self.ENGINE_SLOTS.values()
+                           if getattr(self, engine_attr) is engine)
+        worker = getattr(self, worker_attr)
+        if worker is None or worker.engine is not engine:
+            if worker:
+                self.retire_worker(worker)
+            worker = EngineWorker(engine, self.settings.get("analysis_update_hz", 30))
+            worker.info.connect(self.on_engine_info)
+            worker.bestmove.connect(self.on_engine_bestmove)
+            worker.error.connect(self.on_engine_error)
+            worker.failed.connect(lambda error_msg, w=worker: self.on_engine_failed(w, error_msg))
+            worker.start()
+            setattr(self, worker_attr, worker)
+        return worker
+
+    def retire_worker(self, worker):
+        """Спира worker без да чака; референцията се пази до края на нишката"""
+        worker.shutdown()
+        self.retired_workers.append(worker)
+        worker.finished.connect(lambda w=worker: self.retired_workers.remove(w) if w in self.retired_workers else None)
 
     def closeEvent(self, event):
         self.timer.stop()
         self.stop_analysis()
+        self.cancel_game_evaluation()
+        self.cancel_pgn_loading()
+        if self.console.match is not None:
+            self.console.match.stop()
         self.close_engines()
-        
+        for worker in list(self.retired_workers):
+            worker.wait(2000)
+        for threads in list(self.spawn_threads.values()):
+            for spawn_thread in list(threads):
+                spawn_thread.wait(5000)
+        self.eval_cache.close()
+        self.adjudicator.close()
+        self.tablebase.close()
+        self.pgn_games.close()
+
         # Затваряне на PGN диалога, ако е отворен
         if self.pgn_dialog:
             try:
@@ -4433,9 +6729,16 @@ PyChess Pro+ v1.0
         self.nodes_label.setStyleSheet("color: #00ffaa; padding: 0 5px;")
         self.nodes_label.setMinimumWidth(120)
         
+        self.tablebase_label = QLabel("")
+        self.tablebase_label.setFont(QFont("Segoe UI", 10, QFont.Bold))
+        self.tablebase_label.setAlignment(Qt.AlignCenter)
+        self.tablebase_label.setStyleSheet("color: #ff66cc; padding: 0 5px;")
+        self.tablebase_label.hide()
+        
         stats_layout.addWidget(self.depth_label, 0, 0)
         stats_layout.addWidget(self.eval_label, 0, 1)
         stats_layout.addWidget(self.nodes_label, 0, 2)
+        stats_layout.addWidget(self.tablebase_label, 1, 0, 1, 3)
         
         stats_layout.setColumnStretch(0, 1)
         stats_layout.setColumnStretch(1, 1)
@@ -4495,7 +6798,7 @@ PyChess Pro+ v1.0
         """ВАЖНА КОРЕКЦИЯ: Актуализира показването на кой е на ход"""
         if self.is_engine_vs_engine:
             if self.current_board.turn == chess.WHITE:
-                engine_path = self.settings.get("engine1_path", "")
+                engine_path = self.settings.get(f"engine{self.engine_num_for_color(chess.WHITE)}_path", "")
                 if engine_path:
                     engine_name = os.path.basename(engine_path)
                 else:
@@ -4505,7 +6808,7 @@ PyChess Pro+ v1.0
                 else:
                     text = f"{engine_name} to move (White)"
             else:
-                engine_path = self.settings.get("engine2_path", "")
+                engine_path = self.settings.get(f"engine{self.engine_num_for_color(chess.BLACK)}_path", "")
                 if engine_path:
                     engine_name = os.path.basename(engine_path)
                 else:
@@ -4597,7 +6900,7 @@ PyChess Pro+ v1.0
             pass
 
     def history_clicked_safe(self, item):
-        if self.is_engine_vs_engine and (self.game_thread and self.game_thread.isRunning()):
+        if self.is_engine_vs_engine and self.engine_thinking:
             QMessageBox.warning(self, "Внимание" if self.language == "bg" else "Warning", 
                                "Не може да навигирате история по време на игра двигател срещу двигател." if self.language == "bg" else "Cannot navigate history during engine-vs-engine game.")
             return
@@ -4610,11 +6913,12 @@ PyChess Pro+ v1.0
         # Ред 0, Кол 2 -> Ход 1 (Черни)
         # Ред 1, Кол 1 -> Ход 2 (Бели)
         
+        # При начало с ход на черните всички индекси са изместени с едно
         move_index = -1
         if col == 1:
-            move_index = row * 2
+            move_index = row * 2 - self.move_table_offset()
         elif col == 2:
-            move_index = row * 2 + 1
+            move_index = row * 2 + 1 - self.move_table_offset()
             
         if move_index >= 0 and move_index < len(self.game_board.move_stack):
             self.navigate_to_move(move_index)
@@ -4624,14 +6928,8 @@ PyChess Pro+ v1.0
         self.stop_engine_thread()
         self.stop_analysis()
         
-        # Създаваме временно табло до този ход
-        temp_board = chess.Board()
-        # Ако играта не започва от начална позиция, трябва да се съобрази
-        if self.game_board.move_stack:
-            try:
-                temp_board.set_fen(self.game_board.move_stack[0].board().fen())
-            except:
-                pass
+        # Създаваме временно табло до този ход от началната позиция на партията
+        temp_board = self.game_board.root()
                 
         for i in range(index + 1):
             temp_board.push(self.game_board.move_stack[i])
@@ -4675,10 +6973,11 @@ PyChess Pro+ v1.0
         p, _ = QFileDialog.getOpenFileName(self, "UCI двигател (Бели)" if self.language == "bg" else "UCI Engine (White)")
         if p:
             try:
-                self.close_engines()
-                self.engine = chess.engine.SimpleEngine.popen_uci(p)
-                self.engine.configure({"Threads": self.eng1_threads})
+                self.stop_engine_thread()
+                self.stop_analysis()
                 self.settings.set("engine1_path", p)
+                self.ensure_engine(1, raise_errors=True)
+                self.ensure_engine("analysis")
                 QMessageBox.information(self, "Двигател" if self.language == "bg" else "Engine", "Двигател 1 зареден!" if self.language == "bg" else "Engine 1 loaded!")
                 if not self.is_engine_vs_engine and self.game_board.turn != self.player_color:
                     self.start_analysis()
@@ -4693,16 +6992,31 @@ PyChess Pro+ v1.0
         p, _ = QFileDialog.getOpenFileName(self, "UCI двигател (Черни)" if self.language == "bg" else "UCI Engine (Black)")
         if p:
             try:
-                self.close_engines()
-                self.engine2 = chess.engine.SimpleEngine.popen_uci(p)
-                self.engine2.configure({"Threads": self.eng2_threads})
+                self.stop_engine_thread()
+                self.stop_analysis()
                 self.settings.set("engine2_path", p)
+                self.ensure_engine(2, raise_errors=True)
                 QMessageBox.information(self, "Двигател" if self.language == "bg" else "Engine", "Двигател 2 зареден!" if self.language == "bg" else "Engine 2 loaded!")
                 self.update_turn_display()
             except Exception as e:
                 QMessageBox.warning(self, "Грешка" if self.language == "bg" else "Error", 
                                   f"Грешка при зареждане на двигател: {e}" if self.language == "bg" else f"Could not load engine: {e}")
 
+    def load_analysis_engine(self):
+        if not HAS_ENGINE: 
+            return
+        p, _ = QFileDialog.getOpenFileName(self, "UCI двигател (Анализ)" if self.language == "bg" else "UCI Engine (Analysis)")
+        if p:
+            try:
+                self.stop_analysis()
+                self.settings.set("analysis_engine_path", p)
+                self.ensure_engine("analysis", raise_errors=True)
+                QMessageBox.information(self, "Двигател" if self.language == "bg" else "Engine", "Двигателят за анализ е зареден!" if self.language == "bg" else "Analysis engine loaded!")
+                self.start_analysis()
+            except Exception as e:
+                QMessageBox.warning(self, "Грешка" if self.language == "bg" else "Error", 
+                                  f"Грешка при зареждане на двигател: {e}" if self.language == "bg" else f"Could not load engine: {e}")
+
     def load_book(self):
         p, _ = QFileDialog.getOpenFileName(self, "Polyglot отваряне" if self.language == "bg" else "Polyglot Book", filter="*.bin")
         if p:
@@ -4795,23 +7109,16 @@ PyChess Pro+ v1.0
         layout.addRow("Играеш като:" if self.language == "bg" else "Play as:", color_combo)
         
         engine_limit_combo = QComboBox()
-        engine_limit_combo.addItems(["Въз основа на време (TC)" if self.language == "bg" else "Time based (TC)",
-                                   "Дълбочина 15 (Стандарт)" if self.language == "bg" else "Depth 15 (Standard)",
-                                   "Дълбочина 20 (Силно)" if self.language == "bg" else "Depth 20 (Strong)",
-                                   "Дълбочина 10 (Бързо)" if self.language == "bg" else "Depth 10 (Fast)",
-                                   "Позиции 1000000" if self.language == "bg" else "Nodes 1000000"])
-        current_strength = self.settings.get("engine_strength", "time_based")
-        if current_strength == "time_based":
-            engine_limit_combo.setCurrentText("Въз основа на време (TC)" if self.language == "bg" else "Time based (TC)")
-        elif current_strength == "depth_15":
-            engine_limit_combo.setCurrentText("Дълбочина 15 (Стандарт)" if self.language == "bg" else "Depth 15 (Standard)")
-        elif current_strength == "depth_20":
-            engine_limit_combo.setCurrentText("Дълбочина 20 (Силно)" if self.language == "bg" else "Depth 20 (Strong)")
-        elif current_strength == "depth_10":
-            engine_limit_combo.setCurrentText("Дълбочина 10 (Бързо)" if self.language == "bg" else "Depth 10 (Fast)")
-        elif current_strength == "nodes_1000000":
-            engine_limit_combo.setCurrentText("Позиции 1000000" if self.language == "bg" else "Nodes 1000000")
+        engine2_limit_combo = QComboBox()
+        engine2_limit_combo.addItem("Като двигател 1" if self.language == "bg" else "Same as Engine 1", "")
+        for key, (_, label_bg, label_en) in SEARCH_PROFILES.items():
+            label = label_bg if self.language == "bg" else label_en
+            engine_limit_combo.addItem(label, key)
+            engine2_limit_combo.addItem(label, key)
+        engine_limit_combo.setCurrentIndex(max(0, engine_limit_combo.findData(self.engine_strength)))
+        engine2_limit_combo.setCurrentIndex(max(0, engine2_limit_combo.findData(self.settings.get("engine2_strength", ""))))
         layout.addRow("Сила на двигателя:" if self.language == "bg" else "Engine Strength:", engine_limit_combo)
+        layout.addRow("Сила на двигател 2:" if self.language == "bg" else "Engine 2 Strength:", engine2_limit_combo)
         
         time_spin = QSpinBox()
         time_spin.setRange(1, 180)
@@ -4823,6 +7130,45 @@ PyChess Pro+ v1.0
         inc_spin.setValue(self.increment)
         layout.addRow("Инкремент (сек):" if self.language == "bg" else "Increment (sec):", inc_spin)
         
+        session_spin = QSpinBox()
+        session_spin.setRange(0, 100)
+        session_spin.setValue(self.settings.get("moves_per_session", 0))
+        session_spin.setSpecialValueText("—")
+        layout.addRow("Ходове за контрола (0 = цяла партия):" if self.language == "bg" else "Moves per time control (0 = whole game):", session_spin)
+        
+        # Присъждане в двигател срещу двигател (0 ходове/фигури = изключено)
+        resign_score_spin = QSpinBox()
+        resign_score_spin.setRange(100, 10000)
+        resign_score_spin.setSingleStep(100)
+        resign_score_spin.setValue(self.settings.get("adjudicate_resign_score", 1000))
+        resign_moves_spin = QSpinBox()
+        resign_moves_spin.setRange(0, 50)
+        resign_moves_spin.setValue(self.settings.get("adjudicate_resign_moves", 5))
+        resign_layout = QHBoxLayout()
+        resign_layout.addWidget(resign_score_spin)
+        resign_layout.addWidget(resign_moves_spin)
+        layout.addRow("Загуба: оценка (cp) / ходове:" if self.language == "bg" else "Resign: score (cp) / moves:", resign_layout)
+        
+        draw_score_spin = QSpinBox()
+        draw_score_spin.setRange(0, 100)
+        draw_score_spin.setValue(self.settings.get("adjudicate_draw_score", 10))
+        draw_moves_spin = QSpinBox()
+        draw_moves_spin.setRange(0, 100)
+        draw_moves_spin.setValue(self.settings.get("adjudicate_draw_moves", 10))
+        draw_after_spin = QSpinBox()
+        draw_after_spin.setRange(0, 200)
+        draw_after_spin.setValue(self.settings.get("adjudicate_draw_move_number", 40))
+        draw_layout = QHBoxLayout()
+        draw_layout.addWidget(draw_score_spin)
+        draw_layout.addWidget(draw_moves_spin)
+        draw_layout.addWidget(draw_after_spin)
+        layout.addRow("Реми: оценка (cp) / ходове / след ход:" if self.language == "bg" else "Draw: score (cp) / moves / after move:", draw_layout)
+        
+        tb_pieces_spin = QSpinBox()
+        tb_pieces_spin.setRange(0, 7)
+        tb_pieces_spin.setValue(self.settings.get("adjudicate_tb_pieces", 6))
+        layout.addRow("Таблици: до брой фигури:" if self.language == "bg" else "Tablebase: max pieces:", tb_pieces_spin)
+        
         pv_moves_spin = QSpinBox()
         pv_moves_spin.setRange(5, 50)
         pv_moves_spin.setValue(self.pv_moves_display)
@@ -4893,23 +7239,21 @@ PyChess Pro+ v1.0
             self.settings.set("player_color", "white" if self.player_color == chess.WHITE else "black")
             self.settings.set("time_control", self.time_control)
             self.settings.set("increment", self.increment)
+            self.settings.set("moves_per_session", session_spin.value())
+            self.settings.set("adjudicate_resign_score", resign_score_spin.value())
+            self.settings.set("adjudicate_resign_moves", resign_moves_spin.value())
+            self.settings.set("adjudicate_draw_score", draw_score_spin.value())
+            self.settings.set("adjudicate_draw_moves", draw_moves_spin.value())
+            self.settings.set("adjudicate_draw_move_number", draw_after_spin.value())
+            self.settings.set("adjudicate_tb_pieces", tb_pieces_spin.value())
+            self.reload_adjudicator()
             self.settings.set("pv_moves_display", self.pv_moves_display)
             self.settings.set("theme", self.current_theme)
             self.settings.set("language", self.language)
             
-            limit_text = engine_limit_combo.currentText()
-            if "Дълбочина 15" in limit_text or "Depth 15" in limit_text:
-                self.engine_strength = "depth_15"
-            elif "Дълбочина 20" in limit_text or "Depth 20" in limit_text:
-                self.engine_strength = "depth_20"
-            elif "Дълбочина 10" in limit_text or "Depth 10" in limit_text:
-                self.engine_strength = "depth_10"
-            elif "Позиции" in limit_text or "Nodes" in limit_text:
-                self.engine_strength = "nodes_1000000"
-            elif "Въз основа на време" in limit_text or "Time based" in limit_text:
-                self.engine_strength = "time_based"
-            
+            self.engine_strength = engine_limit_combo.currentData()
             self.settings.set("engine_strength", self.engine_strength)
+            self.settings.set("engine2_strength", engine2_limit_combo.currentData())
             
             if old_mode != self.is_engine_vs_engine or old_color != self.player_color:
                 self.new_game()
@@ -4932,41 +7276,40 @@ PyChess Pro+ v1.0
         self.is_paused = False
         self.btn_pause.setText("Пауза" if self.language == "bg" else "Pause")
         
-        self.close_engines()
-        
-        engine1_path = self.settings.get("engine1_path", "")
-        if engine1_path and os.path.exists(engine1_path) and HAS_ENGINE:
-            try:
-                self.engine = chess.engine.SimpleEngine.popen_uci(engine1_path)
-                self.engine.configure({"Threads": self.eng1_threads})
-            except:
-                self.engine = None
-                
-        engine2_path = self.settings.get("engine2_path", "")
-        if engine2_path and os.path.exists(engine2_path) and HAS_ENGINE:
-            try:
-                self.engine2 = chess.engine.SimpleEngine.popen_uci(engine2_path)
-                self.engine2.configure({"Threads": self.eng2_threads})
-            except:
-                self.engine2 = None
-        
-        self.game_board.reset()
+        # Процесите се запазват между партиите; новата идентичност изпраща ucinewgame
+        self.engine_game = object()
+        self.failed_search_fen = None
+        for eng_num in self.ENGINE_SLOTS:
+            self.ensure_engine(eng_num)
+        
+        self.cancel_game_evaluation()
+        self.adjudicator.reset()
+        self.pending_move_items = []
+        self.pending_search_info = None
+        self.gui_dirty = False
+        self.colors_swapped = False
+        if self.is_engine_vs_engine and self.opening_suite is not None:
+            # Следващата позиция от набора; всяка втора партия е със сменени цветове
+            self.game_board, self.colors_swapped = self.opening_suite.next_game()
+            self.settings.set("opening_suite_cursor", self.opening_suite.cursor)
+        else:
+            self.game_board = chess.Board()
         self.current_board = self.game_board
         self.is_navigating_history = False
         self.book_move_played = False
         
         self.move_evaluations = {}
-        self.current_move_number = 0
+        self.game_evaluation_moves = []
+        self.current_move_number = len(self.game_board.move_stack)
         
         self.white_clock.reset(self.time_control)
         self.black_clock.reset(self.time_control)
         
-        self.move_table.clearContents()
-        self.move_table.setRowCount(0)
+        self.refresh_move_list()
         
         self.game_chart.clear_chart()
         
-        self.board_w.last_move = None
+        self.board_w.last_move = self.game_board.peek() if self.game_board.move_stack else None
         self.board_w.selected = None
         self.board_w.legal_moves_for_selected = []
         self.board_w.best_engine_move = None
@@ -4983,9 +7326,7 @@ PyChess Pro+ v1.0
         if self.is_engine_vs_engine:
             self.human_turn = False
             self.start_analysis()
-            if self.game_board.turn == chess.WHITE and self.engine:
-                QTimer.singleShot(500, self.start_engine)
-            elif self.game_board.turn == chess.BLACK and self.engine2:
+            if self.engine_for_color(self.game_board.turn):
                 QTimer.singleShot(500, self.start_engine)
         else:
             current_turn = self.game_board.turn
@@ -5002,71 +7343,257 @@ PyChess Pro+ v1.0
             return
             
         current_engine = None
-        if self.is_engine_vs_engine:
-            if self.current_board.turn == chess.WHITE:
-                current_engine = self.engine
-            else:
-                current_engine = self.engine2
+        if self.analysis_engine:
+            current_engine = self.analysis_engine
+        elif self.is_engine_vs_engine:
+            current_engine = self.engine_for_color(self.current_board.turn)
         else:
             current_engine = self.engine
         
         if not current_engine:
             return
             
-        if self.analysis_thread and self.analysis_thread.isRunning():
-            self.analysis_thread.stop()
-            self.analysis_thread.wait(2000)
-            self.analysis_thread = None
+        if self.analysis_token is not None:
+            self.analysis_worker.stop(self.analysis_token)
+            self.analysis_token = None
         
-        self.analysis_thread = EngineThread(
-            current_engine, 
-            self.current_board, 
-            time_control=0,
-            is_analysis=True
-        )
-        self.analysis_thread.info.connect(self.update_analysis)
-        self.analysis_thread.error.connect(self.handle_engine_error)
-        self.analysis_thread.start()
+        self.update_tablebase_info()
+        
+        # Вече анализирана позиция се показва веднага от кеша
+        self.analysis_board = self.current_board.copy()
+        self.analysis_cached_depth = 0
+        cached = self.eval_cache.get(self.analysis_board)
+        if cached:
+            self.analysis_cached_depth = cached["depth"]
+            self.update_analysis({"depth": cached["depth"], "score": cached["score"], "pv": cached["pv"]})
+        
+        # Ново търсене само ако се иска по-голяма дълбочина от кешираната
+        target_depth = self.settings.get("analysis_target_depth", 0)
+        if target_depth and self.analysis_cached_depth >= target_depth:
+            return
+        
+        self.analysis_worker = self.get_engine_worker(current_engine)
+        multipv = self.settings.get("multipv_lines", 1)
+        self.analysis_token = self.analysis_worker.analyse(self.current_board, game=self.engine_game,
+                                                           multipv=multipv if multipv > 1 else None,
+                                                           limit=chess.engine.Limit(depth=target_depth) if target_depth else None)
 
     def stop_analysis(self):
-        if self.analysis_thread and self.analysis_thread.isRunning():
-            self.analysis_thread.stop()
-            self.analysis_thread.wait(2000)
-            self.analysis_thread = None
+        if self.analysis_token is not None:
+            self.analysis_worker.stop(self.analysis_token)
+            self.analysis_token = None
+        self.eval_cache.flush()
             
         self.board_w.best_engine_move = None
         self.board_w.update()
 
     def stop_engine_thread(self):
-        if self.game_thread and self.game_thread.isRunning():
-            self.game_thread.stop()
-            self.game_thread.wait(2000)
-            self.game_thread = None
+        self.stop_ponder()
+        if self.game_token is not None:
+            self.game_worker.stop(self.game_token)
+            self.game_token = None
                 
         self.engine_thinking = False
         self.book_move_played = False
 
+    def on_engine_info(self, token, info):
+        """Info от worker-ите; съобщенията на отменени команди се игнорират.
+        Докато тече анализ, панелът показва него, а не търсенето за хода."""
+        if token is self.game_token and "time" in info:
+            self.search_engine_time = info["time"]
+        if token is self.game_token and "score" in info:
+            self.search_score = info["score"]
+        if token is self.analysis_token and info.get("depth", 0) >= self.settings.get("eval_cache_min_depth", 10):
+            self.eval_cache.put(self.analysis_board, info, self.analysis_worker.engine.id.get("name", ""))
+        if token is self.analysis_token and info.get("depth", 0) < self.analysis_cached_depth:
+            # По-плитък резултат не заменя вече показаната кеширана оценка
+            return
+        if token is self.analysis_token or (token is self.game_token and self.analysis_token is None):
+            if token is self.game_token and self.fast_mode_active():
+                # В бърз режим панелът с анализа се обновява заедно с останалото GUI (flush_gui)
+                self.pending_search_info = info
+                self.gui_dirty = True
+                return
+            self.update_analysis(info)
+
+    def on_engine_bestmove(self, token, move, ponder):
+        if token is self.game_token:
+            self.game_token = None
+            if self.search_started is not None and self.search_engine_time is not None:
+                self.time_manager.record_overhead(time.monotonic() - self.search_started, self.search_engine_time)
+            self.search_started = None
+            self.engine_move(move)
+            self.start_ponder(ponder)
+
+    def start_ponder(self, ponder_move):
+        """Докато човекът мисли, двигателят търси в позицията след предсказания му отговор"""
+        if (ponder_move is None or not self.settings.get("ponder", True) or self.is_engine_vs_engine
+                or not self.human_turn or self.is_paused or not self.engine):
+            return
+        # Без отделен двигател за анализ ponder-ът би блокирал анализа в същия процес
+        if not self.analysis_engine or ponder_move not in self.game_board.legal_moves:
+            return
+        
+        board = self.game_board.copy()
+        board.push(ponder_move)
+        if board.is_game_over():
+            return
+        
+        self.stop_ponder()
+        self.ponder_worker = self.get_engine_worker(self.engine)
+        self.ponder_token = self.ponder_worker.ponder(board, self.build_search_limit(1, board), game=self.engine_game)
+        self.ponder_fen = board.fen()
+
+    def stop_ponder(self):
+        if self.ponder_token is not None:
+            self.ponder_worker.stop(self.ponder_token)
+            self.ponder_token = None
+        self.ponder_fen = None
+
+    def on_engine_error(self, token, error_msg):
+        if token is self.game_token:
+            self.handle_game_search_error(error_msg)
+        elif token is self.analysis_token:
+            self.handle_engine_error(error_msg)
+
+    def handle_game_search_error(self, error_msg):
+        """Търсенето на ход в играта се провали (напр. невалиден bestmove): двигателят се рестартира
+        и ходът се търси наново; втори провал в същата позиция спира играта със съобщение"""
+        eng_num = self.engine_slot_of_worker(self.game_worker)
+        fen = self.game_board.fen()
+        retry = eng_num is not None and eng_num not in self.restarting_slots and fen != self.failed_search_fen
+        self.failed_search_fen = fen
+        if retry and self.restart_failed_engine(eng_num, error_msg, resume_game=True):
+            return
+        
+        self.game_token = None
+        self.engine_thinking = False
+        self.search_started = None
+        self.timer.stop()
+        self.engine_turn_label.setText(f"Грешка на двигателя: {error_msg}" if self.language == "bg"
+                                       else f"Engine error: {error_msg}")
+        QMessageBox.warning(self, "Грешка" if self.language == "bg" else "Error",
+                            f"Двигателят не успя да изиграе ход ({error_msg}). Играта е спряна." if self.language == "bg"
+                            else f"The engine failed to play a move ({error_msg}). The game has been stopped.")
+
     def handle_engine_error(self, error_msg):
-        self.restart_engine()
+        """Грешка в команда при жив двигател: само изчистване на състоянието.
+        Паднал или увиснал процес се обработва от on_engine_failed."""
+        if self.game_token is None and self.engine_thinking:
+            self.engine_thinking = False
 
-    def restart_engine(self):
-        engine1_path = self.settings.get("engine1_path", "")
-        if engine1_path and os.path.exists(engine1_path) and HAS_ENGINE:
+    def engine_slot_of_worker(self, worker):
+        for eng_num, (engine_attr, worker_attr) in self.ENGINE_SLOTS.items():
+            if getattr(self, worker_attr) is worker:
+                return eng_num
+        return None
+
+    def supervise_engines(self):
+        """Периодична проверка: изход на процеса, увиснало търсене, isready при бездействие
+        и при безкраен анализ, в който двигателят мълчи"""
+        now = time.monotonic()
+        ping_interval = self.settings.get("engine_ping_interval", 5)
+        response_timeout = self.settings.get("engine_response_timeout", 60)
+        for eng_num, (engine_attr, worker_attr) in self.ENGINE_SLOTS.items():
+            engine = getattr(self, engine_attr)
+            worker = getattr(self, worker_attr)
+            if engine is None or eng_num in self.restarting_slots:
+                continue
+            if engine.returncode.done():
+                self.restart_failed_engine(eng_num, "Engine exited")
+            elif worker is not None and worker.is_hung(response_timeout):
+                self.restart_failed_engine(eng_num, "Engine not responding")
+            elif worker is not None and worker.is_idle() and now - self.last_engine_ping.get(eng_num, 0) > ping_interval:
+                self.last_engine_ping[eng_num] = now
+                worker.ping()
+            elif worker is not None:
+                worker.probe(ping_interval)
+
+    def on_engine_failed(self, worker, error_msg):
+        eng_num = self.engine_slot_of_worker(worker)
+        if eng_num is not None and eng_num not in self.restarting_slots:
+            self.restart_failed_engine(eng_num, error_msg)
+
+    def restart_failed_engine(self, eng_num, error_msg, resume_game=None):
+        """Рестартира във фонов режим само падналия двигател с последните му опции
+        и след това възобновява прекъснатото търсене или анализ. False, ако рестарт не е възможен"""
+        engine_attr, worker_attr = self.ENGINE_SLOTS[eng_num]
+        engine = getattr(self, engine_attr)
+        worker = getattr(self, worker_attr)
+        if resume_game is None:
+            resume_game = worker is not None and worker is self.game_worker and self.game_token is not None
+        resume_analysis = worker is not None and worker is self.analysis_worker and self.analysis_token is not None
+        
+        # Затваряне на транспорта освобождава worker-а, ако е блокиран в увиснал процес
+        if engine is not None:
             try:
-                self.close_engines()
-                self.engine = chess.engine.SimpleEngine.popen_uci(engine1_path)
-                self.engine.configure({"Threads": self.eng1_threads})
-            except:
-                self.engine = None
+                engine.close()
+            except Exception:
+                pass
+        self.close_engine(eng_num)
+        if resume_game:
+            self.game_token = None
+            self.engine_thinking = False
         
-        engine2_path = self.settings.get("engine2_path", "")
-        if engine2_path and os.path.exists(engine2_path) and HAS_ENGINE:
+        path, options = self.engine_slot_config(eng_num)
+        if not (path and os.path.exists(path) and HAS_ENGINE):
+            return False
+        
+        self.engine_turn_label.setText(f"Двигателят се рестартира ({error_msg})..." if self.language == "bg"
+                                       else f"Restarting engine ({error_msg})...")
+        spawn_thread = EngineSpawnThread(path, options)
+        spawn_thread.spawned.connect(lambda engine, n=eng_num: self.on_engine_respawned(n, engine, resume_game, resume_analysis))
+        spawn_thread.error.connect(lambda msg, n=eng_num: self.on_engine_respawn_failed(n, msg, resume_game))
+        spawn_thread.finished.connect(lambda n=eng_num, t=spawn_thread: self.on_spawn_thread_finished(n, t))
+        self.restarting_slots[eng_num] = spawn_thread
+        self.spawn_threads.setdefault(eng_num, []).append(spawn_thread)
+        spawn_thread.start()
+        return True
+
+    def on_spawn_thread_finished(self, eng_num, spawn_thread):
+        threads = self.spawn_threads.get(eng_num, [])
+        if spawn_thread in threads:
+            threads.remove(spawn_thread)
+        if not threads:
+            self.spawn_threads.pop(eng_num, None)
+        spawn_thread.deleteLater()
+
+    def on_engine_respawn_failed(self, eng_num, error_msg, resume_game):
+        self.restarting_slots.pop(eng_num, None)
+        self.engine_turn_label.setText(f"Двигателят не се стартира: {error_msg}" if self.language == "bg"
+                                       else f"Engine failed to start: {error_msg}")
+        if resume_game:
+            self.timer.stop()
+            QMessageBox.warning(self, "Грешка" if self.language == "bg" else "Error",
+                                f"Двигателят не успя да се рестартира ({error_msg}). Играта е спряна." if self.language == "bg"
+                                else f"The engine could not be restarted ({error_msg}). The game has been stopped.")
+
+    def on_engine_respawned(self, eng_num, engine, resume_game, resume_analysis):
+        engine_attr = self.ENGINE_SLOTS[eng_num][0]
+        self.restarting_slots.pop(eng_num, None)
+        if getattr(self, engine_attr) is not None:
+            # Междувременно е зареден друг двигател
             try:
-                self.close_engines()
-                self.engine2 = chess.engine.SimpleEngine.popen_uci(engine2_path)
-                self.engine2.configure({"Threads": self.eng2_threads})
-            except:
-                self.engine2 = None
+                engine.quit()
+            except Exception:
+                pass
+            return
+        
+        setattr(self, engine_attr, engine)
+        path, options = self.engine_slot_config(eng_num)
+        self.engine_spawn_config[eng_num] = (path, {name: value for name, value in options.items() if name in engine.options})
+        
+        if resume_game and not self.game_board.is_game_over() and not self.game_token:
+            QTimer.singleShot(0, self.start_engine)
+        if resume_analysis and self.analysis_token is None:
+            QTimer.singleShot(0, self.start_analysis)
+
+    def restart_engine(self, force=False):
+        """Рестартира двигателите, чиито процеси са паднали (или всички при force)"""
+        self.stop_engine_thread()
+        self.stop_analysis()
+        for eng_num in self.ENGINE_SLOTS:
+            self.ensure_engine(eng_num, force=force)
 
     def history_clicked(self, item):
         row = item.row()
@@ -5097,7 +7624,7 @@ PyChess Pro+ v1.0
         self.highlights_widget.update_highlights(self.current_board)
         self.update_turn_display()
         
-        if self.analysis_thread:
+        if self.analysis_token is not None:
             self.stop_analysis()
         QTimer.singleShot(100, self.start_analysis)
 
@@ -5181,17 +7708,54 @@ PyChess Pro+ v1.0
                                             f"games_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pgn", 
                                             "PGN файлове (*.pgn)" if self.language == "bg" else "PGN Files (*.pgn)")
         if path:
+            # Партиите се четат лениво от отворения файл, затова записът е във временен файл
+            # и замяната е накрая; при запис върху него отместванията се обновяват
+            overwrite = bool(self.pgn_file_path) and os.path.normcase(os.path.abspath(path)) == \
+                os.path.normcase(os.path.abspath(self.pgn_file_path))
+            if overwrite and self.pgn_loader_thread is not None:
+                QMessageBox.warning(self, "Грешка" if self.language == "bg" else "Error",
+                                  "Файлът още се зарежда!" if self.language == "bg" else "The file is still loading!")
+                return
+            tmp_path = path + ".tmp"
             try:
-                with open(path, "w", encoding="utf-8") as f:
+                entries = []
+                with open(tmp_path, "wb") as f:
                     for game in self.pgn_games:
-                        f.write(str(game))
-                        f.write("\n\n")
+                        data = str(game).encode("utf-8")
+                        entries.append((f.tell(), len(data),
+                                        tuple(game.headers.get(name, "") for name in PGNDatabase.HEADER_FIELDS)))
+                        f.write(data)
+                        f.write(b"\n\n")
+                if overwrite:
+                    # Под Windows отвореният файл не може да бъде заменен
+                    old_entries = [self.pgn_games.entry(index) for index in range(len(self.pgn_games))]
+                    self.pgn_games.reindex(entries)
+                    try:
+                        os.replace(tmp_path, path)
+                    except OSError:
+                        self.pgn_games.reindex(old_entries)
+                        raise
+                    self.install_saved_pgn_index(path, entries)
+                else:
+                    os.replace(tmp_path, path)
                 
                 QMessageBox.information(self, "PGN", "PGN базата е запазена успешно!" if self.language == "bg" else "PGN database saved successfully!")
             except Exception as e:
+                PGNSidecarIndex.discard(tmp_path)
                 QMessageBox.warning(self, "Грешка" if self.language == "bg" else "Error", 
                                   f"Грешка при запазване: {str(e)}" if self.language == "bg" else f"Error saving: {str(e)}")
 
+    def install_saved_pgn_index(self, path, entries):
+        """Записва наново .idx файла след презапис на отворената база"""
+        try:
+            stat = os.stat(path)
+            tmp_path = PGNSidecarIndex.write(path, entries, stat.st_size, stat.st_mtime_ns)
+        except OSError as e:
+            print(f"Индексът не е записан: {e}")
+            PGNSidecarIndex.discard(PGNSidecarIndex.index_path(path))
+            return
+        self.pgn_games.install_index(tmp_path)
+
     def load_pgn(self):
         """Зарежда PGN файл (единична партия)"""
         path, _ = QFileDialog.getOpenFileName(self, "Зареди PGN" if self.language == "bg" else "Load PGN", "", 
@@ -5201,41 +7765,105 @@ PyChess Pro+ v1.0
 
     def load_pgn_file(self, path):
         """Зарежда PGN файл с прогрес диалог"""
+        self.cancel_pgn_loading()
+
         # Създаваме диалог за прогрес
-        progress_dialog = ProgressDialog(self, "Зареждане на PGN файл..." if self.language == "bg" else "Loading PGN file...")
+        progress_dialog = ProgressDialog(self, "Зареждане на PGN файл..." if self.language == "bg" else "Loading PGN file...",
+                                         cancellable=True)
         progress_dialog.show()
         
         # Създаваме тред за зареждане
-        self.pgn_loader_thread = PGNLoaderThread(path)
-        self.pgn_loader_thread.progress.connect(lambda value: progress_dialog.set_progress(value))
-        self.pgn_loader_thread.games_loaded.connect(lambda games: self.on_pgn_games_loaded(games, path, progress_dialog))
-        self.pgn_loader_thread.error.connect(lambda err: self.on_pgn_load_error(err, progress_dialog))
-        self.pgn_loader_thread.start()
-
-    def on_pgn_games_loaded(self, games, path, progress_dialog):
-        """Обработка на заредените игри"""
-        progress_dialog.close()
-        
-        if not games:
-            QMessageBox.warning(self, "Грешка" if self.language == "bg" else "Error",
-                              "Няма партии във файла." if self.language == "bg" else "No games found in file.")
+        processes = self.settings.get("pgn_loader_processes", 0) or os.cpu_count() or 1
+        loader = PGNLoaderThread(path, processes, self.settings.get("pgn_index_move_counts", False))
+        self.pgn_loader_thread = loader
+        self.pgn_streamed_games = 0
+        loader.progress.connect(lambda value: progress_dialog.set_progress(value))
+        loader.index_loaded.connect(lambda index: self.on_pgn_index_loaded(loader, index, path, progress_dialog))
+        loader.games_loaded.connect(lambda games: self.on_pgn_games_loaded(loader, games, path, progress_dialog))
+        loader.index_written.connect(lambda tmp_path: self.on_pgn_index_written(loader, tmp_path))
+        loader.loading_finished.connect(lambda count, cancelled: self.on_pgn_loading_finished(loader, count, cancelled, progress_dialog))
+        loader.error.connect(lambda err: self.on_pgn_load_error(loader, err, progress_dialog))
+        progress_dialog.cancelled.connect(loader.cancel)
+        loader.start()
+
+    def cancel_pgn_loading(self):
+        if self.pgn_loader_thread is not None:
+            if self.pgn_loader_thread.isRunning():
+                self.retire_worker(self.pgn_loader_thread)
+            self.pgn_loader_thread = None
+
+    def on_pgn_index_loaded(self, loader, index, path, progress_dialog):
+        """Валиден индекс от предишно отваряне: базата е готова без сканиране"""
+        if loader is not self.pgn_loader_thread:
+            index.close()
             return
-        
+        self.pgn_games.close()
         self.pgn_file_path = path
-        self.pgn_games = games
-        self.current_pgn_index = 0
-        
-        if len(self.pgn_games) == 1:
-            # Ако има само една партия, зареждаме я директно
+        self.pgn_games = PGNDatabase(path, index=index)
+        self.show_loaded_pgn_games(0, progress_dialog)
+
+    def on_pgn_games_loaded(self, loader, games, path, progress_dialog):
+        """Поредна порция партии; първата заменя текущата база и се показва веднага"""
+        if loader is not self.pgn_loader_thread:
+            return
+
+        if not self.pgn_streamed_games:
+            self.pgn_games.close()
+            self.pgn_file_path = path
+            self.pgn_games = PGNDatabase(path)
+        start = len(self.pgn_games)
+        self.pgn_games.add(games)
+        self.show_loaded_pgn_games(start, progress_dialog)
+
+    def show_loaded_pgn_games(self, start, progress_dialog):
+        """Показва партиите от индекс start нататък; при start == 0 базата е нова"""
+        if start == 0:
+            self.current_pgn_index = 0
             self.load_pgn_game(0)
+            if self.pgn_dialog:
+                self.pgn_dialog.pgn_games = self.pgn_games
+                self.pgn_dialog.load_games()
+        else:
+            if self.pgn_dialog:
+                self.pgn_dialog.append_games(start)
+            self.update_pgn_info()
+        self.pgn_streamed_games = len(self.pgn_games)
+
+        progress_dialog.set_details(f"Заредени партии: {self.pgn_streamed_games}" if self.language == "bg"
+                                    else f"Games loaded: {self.pgn_streamed_games}")
+
+    def on_pgn_index_written(self, loader, tmp_path):
+        if loader is not self.pgn_loader_thread:
+            PGNSidecarIndex.discard(tmp_path)
+            return
+        self.pgn_games.install_index(tmp_path)
+
+    def on_pgn_loading_finished(self, loader, count, cancelled, progress_dialog):
+        """Край на зареждането (пълно или прекъснато)"""
+        progress_dialog.close()
+        if loader is not self.pgn_loader_thread:
+            return
+        self.pgn_loader_thread = None
+
+        if not count:
+            if not cancelled:
+                QMessageBox.warning(self, "Грешка" if self.language == "bg" else "Error",
+                                  "Няма партии във файла." if self.language == "bg" else "No games found in file.")
+            return
+        
+        if count == 1 and not cancelled:
+            # Ако има само една партия, тя вече е заредена
             QMessageBox.information(self, "PGN", "Партията е заредена успешно!" if self.language == "bg" else "Game loaded successfully!")
         else:
             # Ако има повече партии, показваме диалог за избор
             self.show_pgn_database_dialog()
     
-    def on_pgn_load_error(self, error_msg, progress_dialog):
+    def on_pgn_load_error(self, loader, error_msg, progress_dialog):
         """Обработка на грешка при зареждане"""
         progress_dialog.close()
+        if loader is not self.pgn_loader_thread:
+            return
+        self.pgn_loader_thread = None
         QMessageBox.warning(self, "Грешка" if self.language == "bg" else "Error", 
                           f"Грешка при зареждане на PGN: {error_msg}" if self.language == "bg" else f"Error loading PGN: {error_msg}")
 
@@ -5294,35 +7922,35 @@ PyChess Pro+ v1.0
         self.update_turn_display()
         
         self.move_evaluations = {}
+        self.game_evaluation_moves = list(self.game_board.move_stack)
         self.current_move_number = len(self.game_board.move_stack)
         
         # Изчистваме и реинициализираме графиката с оценките
         self.game_chart.clear_chart()
+        self.cancel_game_evaluation()
         
-        # Генерираме оценки за всички ходове
-        temp_board = chess.Board()
-        # Ако играта не започва от начална позиция
-        if self.game_board.move_stack:
-            try:
-                temp_board.set_fen(self.game_board.move_stack[0].board().fen())
-            except:
-                pass
-        
-        move_count = 0
-        for i, move in enumerate(self.game_board.move_stack):
-            move_count += 1
-            san_move = temp_board.san(move)
-            
-            # Тук може да добавите логика за изчисляване на оценка за всеки ход
-            # За сега ще използваме случайни оценки за демонстрация
-            import random
-            eval_cp = random.randint(-300, 300)
-            
-            # Актуализираме графиката
-            self.game_chart.update_chart(move_count, san_move, eval_cp)
-            temp_board.push(move)
+        # Оценките от [%eval] коментарите и кеша се показват веднага,
+        # останалите позиции се оценяват във фонов режим
+        pending = []
+        board = game.board()
+        for ply, node in enumerate(game.mainline()):
+            san_move = board.san(node.move)
+            board.push(node.move)
+            score = node.eval()
+            if score is None:
+                cached = self.eval_cache.get(board)
+                score = cached["score"] if cached else None
+            if score is None:
+                pending.append((ply, board.copy()))
+                eval_cp = 0
+            else:
+                eval_cp = self.white_eval_cp(score)
+                self.move_evaluations[ply] = eval_cp
+            self.game_chart.update_chart(ply + 1, san_move, eval_cp)
+        self.show_move_evaluations()
+        self.start_game_evaluation(pending)
         
-        if self.analysis_thread:
+        if self.analysis_token is not None:
             self.stop_analysis()
         
         QTimer.singleShot(100, self.start_analysis)
@@ -5334,6 +7962,88 @@ PyChess Pro+ v1.0
         self.eval_bar.set_score(0)
         self.last_eval = 0
 
+    def white_eval_cp(self, score):
+        """PovScore -> сантипешки от гледна точка на белите (мат = ±1000 като в лентата)"""
+        white_score = score.white()
+        if white_score.is_mate():
+            return 1000 if white_score.mate() > 0 else -1000
+        return white_score.score()
+
+    def start_game_evaluation(self, positions):
+        """Пуска пул от двигатели, който оценява позициите на заредената партия"""
+        path, options = self.engine_slot_config("analysis")
+        if not positions or not path or not os.path.exists(path):
+            return
+        # Паралелизмът идва от броя процеси, затова всеки ползва една нишка
+        options["Threads"] = 1
+        move_time = self.settings.get("game_eval_time", 0.0)
+        if move_time:
+            limit = chess.engine.Limit(time=move_time)
+        else:
+            limit = chess.engine.Limit(nodes=self.settings.get("game_eval_nodes", 200000))
+        evaluator = GameEvaluatorThread(path, options, positions, limit,
+                                        self.settings.get("game_eval_engines", 2))
+        evaluator.evaluated.connect(lambda ply, info, name, ev=evaluator: self.on_game_eval(ev, ply, info, name))
+        evaluator.error.connect(lambda error_msg: print(f"Game evaluation error: {error_msg}"))
+        evaluator.finished.connect(self.eval_cache.flush)
+        self.game_evaluator = evaluator
+        evaluator.start()
+
+    def cancel_game_evaluation(self):
+        if self.game_evaluator is not None:
+            if self.game_evaluator.isRunning():
+                self.retire_worker(self.game_evaluator)
+            self.game_evaluator = None
+
+    def on_game_eval(self, evaluator, ply, info, engine_name):
+        """Оценка от фоновия пул -> кеш, графика и таблица с ходовете"""
+        if evaluator is not self.game_evaluator:
+            return
+        # Партията може да е продължила или да е върната назад след зареждането
+        moves = self.game_evaluation_moves
+        if ply >= len(self.game_board.move_stack) or self.game_board.move_stack[:ply + 1] != moves[:ply + 1]:
+            return
+        board = self.game_board.root()
+        for move in moves[:ply + 1]:
+            board.push(move)
+        if info.get("depth", 0) >= self.settings.get("eval_cache_min_depth", 10):
+            self.eval_cache.put(board, info, engine_name)
+        eval_cp = self.white_eval_cp(info["score"])
+        self.move_evaluations[ply] = eval_cp
+        self.game_chart.set_eval(ply, eval_cp)
+        self.show_move_evaluation(ply)
+
+    def show_move_evaluation(self, ply):
+        """Добавя оценката към клетката на хода в таблицата"""
+        cell = ply + self.move_table_offset()
+        item = self.move_table.item(cell // 2, 1 + cell % 2)
+        if item is None or ply not in self.move_evaluations:
+            return
+        san = item.data(Qt.UserRole) or item.text()
+        eval_cp = self.move_evaluations[ply]
+        eval_text = f"#{'+' if eval_cp > 0 else '-'}" if abs(eval_cp) >= 1000 else f"{eval_cp / 100:+.2f}"
+        item.setData(Qt.UserRole, san)
+        item.setText(f"{san}  {eval_text}")
+        item.setToolTip(f"{'Оценка' if self.language == 'bg' else 'Eval'}: {eval_text}")
+
+    def show_move_evaluations(self):
+        self.prune_move_evaluations()
+        for ply in self.move_evaluations:
+            self.show_move_evaluation(ply)
+
+    def prune_move_evaluations(self):
+        """Оставя само оценките от общото начало на партията и оценената линия
+        (след връщане на ход или отклонение от заредената партия)"""
+        moves = self.game_board.move_stack
+        common = 0
+        for move, evaluated in zip(moves, self.game_evaluation_moves):
+            if move != evaluated:
+                break
+            common += 1
+        if common < len(self.game_evaluation_moves):
+            del self.game_evaluation_moves[common:]
+            self.move_evaluations = {ply: eval_cp for ply, eval_cp in self.move_evaluations.items() if ply < common}
+
     def get_pgn_game_info(self, game):
         """Връща информация за PGN партията"""
         if self.language == "bg":
@@ -5462,11 +8172,7 @@ PyChess Pro+ v1.0
         self.current_board = self.game_board
 
         prev_color = not self.game_board.turn
-        if self.increment > 0:
-            if prev_color == chess.WHITE: 
-                self.white_clock.add_increment(self.increment)
-            else: 
-                self.black_clock.add_increment(self.increment)
+        self.apply_move_time(prev_color)
 
         self.refresh_move_list()
         self.board_w.last_move = move
@@ -5493,32 +8199,56 @@ PyChess Pro+ v1.0
         if self.game_board.is_game_over():
             self.game_over()
         else:
-            if self.analysis_thread:
+            if self.analysis_token is not None:
                 self.stop_analysis()
             QTimer.singleShot(100, self.start_analysis)
             QTimer.singleShot(200, self.start_engine)
 
+    def append_move_item(self, ply, san):
+        """Добавя един ход в таблицата, без да я изгражда наново"""
+        cell = ply + self.move_table_offset()
+        row, col = cell // 2, 1 + cell % 2
+        rows = self.move_table.rowCount()
+        # Таблицата не отговаря на партията (напр. след връщане на ход) - пълно опресняване
+        if not ((row == rows and col == 1) or (row == rows - 1 and col == 2)):
+            self.refresh_move_list()
+            return
+        if row == rows:
+            self.move_table.insertRow(row)
+            item_num = QTableWidgetItem(str(self.game_board.root().fullmove_number + row))
+            item_num.setTextAlignment(Qt.AlignCenter)
+            self.move_table.setItem(row, 0, item_num)
+            item_black = QTableWidgetItem("")
+            item_black.setTextAlignment(Qt.AlignCenter)
+            self.move_table.setItem(row, 2, item_black)
+            self.move_table.setRowHeight(row, 30)
+        item = QTableWidgetItem(san)
+        item.setTextAlignment(Qt.AlignCenter)
+        item.setForeground(QColor(255, 255, 255) if self.dark_theme_enabled else QColor(0, 0, 0))
+        self.move_table.setItem(row, col, item)
+        self.prune_move_evaluations()
+        self.show_move_evaluation(ply)
+        self.move_table.scrollToBottom()
+
+    def move_table_offset(self):
+        """1, ако партията започва с ход на черните (клетката на белите в първия ред е празна)"""
+        return 1 if self.game_board.root().turn == chess.BLACK else 0
+
     def refresh_move_list(self):
         """Опреснява таблицата с ходовете"""
         self.move_table.clearContents()
         self.move_table.setRowCount(0)
         
-        temp_board = chess.Board()
-        # Ако играта не започва от начална позиция (напр. след FEN импорт)
-        if self.game_board.move_stack:
-            # Опитваме се да намерим началната позиция
-            try:
-                temp_board.set_fen(self.game_board.move_stack[0].board().fen())
-            except:
-                # Ако не можем, приемаме стандартна или текущата без ходове
-                pass
+        # Началната позиция (след FEN импорт или от набор от дебюти)
+        temp_board = self.game_board.root()
+        first_move_number = temp_board.fullmove_number
 
         row = 0
         i = 0
         
         while i < len(self.game_board.move_stack):
             try:
-                move_num = row + 1
+                move_num = first_move_number + row
                 
                 self.move_table.insertRow(row)
                 
@@ -5526,17 +8256,22 @@ PyChess Pro+ v1.0
                 item_num.setTextAlignment(Qt.AlignCenter)
                 self.move_table.setItem(row, 0, item_num)
                 
-                move_white = self.game_board.move_stack[i]
-                san_white = temp_board.san(move_white)
-                item_white = QTableWidgetItem(san_white)
-                item_white.setTextAlignment(Qt.AlignCenter)
-                if self.dark_theme_enabled:
-                    item_white.setForeground(QColor(255, 255, 255))
+                if row == 0 and temp_board.turn == chess.BLACK:
+                    item_white = QTableWidgetItem("...")
+                    item_white.setTextAlignment(Qt.AlignCenter)
+                    self.move_table.setItem(row, 1, item_white)
                 else:
-                    item_white.setForeground(QColor(0, 0, 0))
-                self.move_table.setItem(row, 1, item_white)
-                temp_board.push(move_white)
-                i += 1
+                    move_white = self.game_board.move_stack[i]
+                    san_white = temp_board.san(move_white)
+                    item_white = QTableWidgetItem(san_white)
+                    item_white.setTextAlignment(Qt.AlignCenter)
+                    if self.dark_theme_enabled:
+                        item_white.setForeground(QColor(255, 255, 255))
+                    else:
+                        item_white.setForeground(QColor(0, 0, 0))
+                    self.move_table.setItem(row, 1, item_white)
+                    temp_board.push(move_white)
+                    i += 1
                 
                 if i < len(self.game_board.move_stack):
                     move_black = self.game_board.move_stack[i]
@@ -5571,6 +8306,8 @@ PyChess Pro+ v1.0
         for r in range(self.move_table.rowCount()):
             self.move_table.setRowHeight(r, 30)
         
+        self.show_move_evaluations()
+        
         if self.move_table.rowCount() > 0:
             self.move_table.scrollToBottom()
 
@@ -5611,26 +8348,32 @@ PyChess Pro+ v1.0
             self.game_over()
             return
         
-        self.update_book_info()
-        self.update_turn_display()
+        if not self.fast_mode_active():
+            self.update_book_info()
+            self.update_turn_display()
 
         if not HAS_ENGINE:
             return
 
+        # Ponderhit, ако човекът изигра предсказания ход; иначе ponder търсенето се отменя
+        ponder_hit = self.ponder_token is not None and self.game_board.fen() == self.ponder_fen
+        if not ponder_hit:
+            self.stop_ponder()
+
         current_move_num = (len(self.game_board.move_stack) // 2) + 1
-        if current_move_num <= self.book_max_depth:
+        # С набор от дебюти двигателите играят от позицията му, без книгата
+        suite_game = self.is_engine_vs_engine and self.opening_suite is not None
+        if current_move_num <= self.book_max_depth and not suite_game:
             book_move = self.get_book_move()
             if book_move:
+                self.stop_ponder()
                 QTimer.singleShot(50, lambda: self.engine_move(book_move))
                 return
 
         current_engine = None
 
         if self.is_engine_vs_engine:
-            if self.game_board.turn == chess.WHITE:
-                current_engine = self.engine
-            else:
-                current_engine = self.engine2
+            current_engine = self.engine_for_color(self.game_board.turn)
             
             if not current_engine:
                 QMessageBox.warning(self, "Грешка в двигателя" if self.language == "bg" else "Engine Error", 
@@ -5645,35 +8388,103 @@ PyChess Pro+ v1.0
 
         self.engine_thinking = True
         
-        if self.analysis_thread:
+        # Анализът се спира само ако споделя процеса с търсенето на хода
+        if self.analysis_token is not None and self.analysis_worker.engine is current_engine:
             self.stop_analysis()
         
-        if self.game_board.turn == chess.WHITE:
-            remaining_time = self.white_clock.time
-        else:
-            remaining_time = self.black_clock.time
-        
-        if self.engine_strength == "time_based":
-            pass
-        elif self.engine_strength == "depth_15":
-            remaining_time = 0
-        elif self.engine_strength == "depth_20":
-            remaining_time = 0
-        elif self.engine_strength == "depth_10":
-            remaining_time = 0
-        elif self.engine_strength == "nodes_1000000":
-            remaining_time = 0
-        
-        self.game_thread = EngineThread(
-            current_engine, 
-            self.game_board, 
-            time_control=remaining_time,
-            increment=self.increment
-        )
-        self.game_thread.info.connect(self.update_analysis)
-        self.game_thread.bestmove.connect(self.engine_move)
-        self.game_thread.error.connect(self.handle_engine_error)
-        self.game_thread.start()
+        if ponder_hit and self.ponder_worker.engine is current_engine:
+            # go ponder е пуснат с часовниците, така че след ponderhit двигателят сам
+            # разпределя времето (и отчита вече обмисленото)
+            self.search_started = None
+            self.game_worker = self.ponder_worker
+            self.game_token = self.ponder_token
+            self.ponder_token = None
+            self.ponder_fen = None
+            self.game_worker.ponderhit(self.game_token)
+            return
+        self.stop_ponder()
+        
+        limit = self.build_search_limit(2 if current_engine is self.engine2 else 1)
+        self.game_worker = self.get_engine_worker(current_engine)
+        self.search_started = time.monotonic()
+        self.search_engine_time = None
+        self.search_score = None
+        self.game_token = self.game_worker.search(self.game_board, limit, game=self.engine_game)
+
+    def engine_num_for_color(self, color):
+        """Кой двигател играе с даден цвят в двигател срещу двигател"""
+        return 1 if (color == chess.WHITE) != self.colors_swapped else 2
+
+    def engine_for_color(self, color):
+        return self.engine if self.engine_num_for_color(color) == 1 else self.engine2
+
+    def load_opening_suite(self, path, order=None):
+        """Зарежда набора; курсорът се нулира само при смяна на файла"""
+        if not path:
+            self.opening_suite = None
+            return
+        if order is None:
+            order = self.settings.get("opening_suite_order", "sequential")
+        cursor = self.settings.get("opening_suite_cursor", 0) if path == self.settings.get("opening_suite_path", "") else 0
+        try:
+            self.opening_suite = OpeningSuite(path, order, cursor)
+        except (OSError, ValueError) as e:
+            self.opening_suite = None
+            print(f"Грешка при зареждане на дебютите: {e}")
+            return
+        self.settings.set("opening_suite_path", path)
+        self.settings.set("opening_suite_order", self.opening_suite.order)
+        self.settings.set("opening_suite_cursor", cursor)
+
+    def load_opening_suite_dialog(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Набор от дебюти" if self.language == "bg" else "Opening Suite", "",
+                                              "EPD/PGN (*.epd *.pgn)")
+        if not path:
+            return
+        self.load_opening_suite(path)
+        if self.opening_suite is not None:
+            QMessageBox.information(self, "Набор от дебюти" if self.language == "bg" else "Opening Suite",
+                                    f"Позиции: {len(self.opening_suite)}" if self.language == "bg"
+                                    else f"Positions: {len(self.opening_suite)}")
+
+    def clear_opening_suite(self):
+        self.opening_suite = None
+        self.settings.set("opening_suite_path", "")
+
+    def toggle_opening_suite_random(self, enabled):
+        order = "random" if enabled else "sequential"
+        self.settings.set("opening_suite_order", order)
+        if self.opening_suite is not None:
+            self.opening_suite.order = order
+
+    def engine_strength_for(self, eng_num):
+        """Ключ на профила за сила на даден двигател (двигател 2 по подразбиране следва двигател 1)"""
+        if eng_num == 2:
+            strength = self.settings.get("engine2_strength", "")
+            if strength in SEARCH_PROFILES:
+                return strength
+        return self.engine_strength if self.engine_strength in SEARCH_PROFILES else "time_based"
+
+    def build_search_limit(self, eng_num, board=None):
+        """Ограничение за търсенето на ход според профила на двигателя; прилага се в едно търсене.
+        board е позицията на търсенето (по подразбиране текущата; за ponder - след предсказания ход)"""
+        params = SEARCH_PROFILES[self.engine_strength_for(eng_num)][0]
+        if params is None:
+            custom = self.settings.get("custom_search_limit", {}) or {}
+            params = {key: custom[key] for key in SEARCH_LIMIT_KEYS if custom.get(key)}
+        if params:
+            return chess.engine.Limit(**params)
+        # Игра по часовник: реалните часовници, двигателят сам разпределя времето
+        return self.time_manager.build_limit(board if board is not None else self.game_board, self.white_clock.time, self.black_clock.time,
+                                             self.increment, self.settings.get("moves_per_session", 0))
+
+    def apply_move_time(self, color):
+        """Инкремент и добавено време при завършена сесия (movestogo) след ход на color"""
+        clock = self.white_clock if color == chess.WHITE else self.black_clock
+        if self.increment > 0:
+            clock.add_increment(self.increment)
+        if self.time_manager.session_completed(self.game_board, color, self.settings.get("moves_per_session", 0)):
+            clock.add_increment(self.time_control)
 
     def engine_move(self, move):
         if not move:
@@ -5696,21 +8507,24 @@ PyChess Pro+ v1.0
             self.current_board = self.game_board
             
             prev_color = not self.game_board.turn
-            if self.increment > 0:
-                if prev_color == chess.WHITE: 
-                    self.white_clock.add_increment(self.increment)
-                else: 
-                    self.black_clock.add_increment(self.increment)
-                
-            self.refresh_move_list()
+            self.apply_move_time(prev_color)
             
             self.board_w.last_move = move
-            self.board_w.update()
-            self.fen_label.setText(self.current_board.fen())
-            self.highlights_widget.update_highlights(self.current_board)
-            self.update_turn_display()
-            
-            self.play_sound("move")
+            fast_mode = self.fast_mode_active()
+            if fast_mode:
+                # Само в паметта; flush_gui показва натрупаното. Info-то от търсенето на хода
+                # се отнася за позицията преди него, затова не се показва
+                self.pending_move_items.append((len(self.game_board.move_stack) - 1, san_move))
+                self.pending_search_info = None
+                self.gui_dirty = True
+            else:
+                self.append_move_item(len(self.game_board.move_stack) - 1, san_move)
+                self.board_w.update()
+                self.fen_label.setText(self.current_board.fen())
+                self.highlights_widget.update_highlights(self.current_board)
+                self.update_turn_display()
+                
+                self.play_sound("move")
             
             self.current_move_number += 1
             if self.last_eval is not None:
@@ -5720,10 +8534,25 @@ PyChess Pro+ v1.0
                 # ИЗПОЛЗВАНЕ НА ЗАПАЗЕНАТА НОТАЦИЯ
                 self.game_chart.update_chart(self.current_move_number, san_move, eval_for_chart)
 
+            # Всеки ход в двигател срещу двигател минава през правилата за присъждане
+            score, self.search_score = self.search_score, None
+            adjudication = None
+            if self.is_engine_vs_engine and not self.game_board.is_game_over():
+                adjudication = self.adjudicator.update(self.game_board, score)
+
             if self.game_board.is_game_over():
                 self.game_over()
+            elif adjudication is not None:
+                self.game_over(adjudication)
             else:
-                if self.is_engine_vs_engine:
+                if fast_mode:
+                    # Без анализ и без изкуствено забавяне - следващият ход веднага след връщане в цикъла
+                    if self.analysis_token is not None:
+                        self.stop_analysis()
+                    self.human_turn = False
+                    self.book_move_played = False
+                    QTimer.singleShot(0, self.start_engine)
+                elif self.is_engine_vs_engine:
                     self.human_turn = False
                     self.book_move_played = False
                     QTimer.singleShot(100, self.start_analysis)
@@ -5743,12 +8572,22 @@ PyChess Pro+ v1.0
             else:
                 QTimer.singleShot(200, self.start_engine)
 
-    def game_over(self):
+    def game_over(self, adjudication=None):
+        self.flush_gui()
         self.timer.stop()
         self.stop_engine_thread()
         self.stop_analysis()
         
-        if self.game_board.is_checkmate():
+        if adjudication is not None:
+            result, reason = adjudication
+            reasons = {"resign": ("оценката е решаваща", "decisive evaluation"),
+                       "draw": ("равна позиция", "drawn evaluation"),
+                       "tablebase": ("ендшпилни таблици", "tablebase")}
+            reason_text = reasons[reason][0] if self.language == "bg" else reasons[reason][1]
+            self.play_sound("notify")
+            QMessageBox.information(self, "Край на играта" if self.language == "bg" else "Game Over", 
+                                  f"Присъден резултат {result} ({reason_text})" if self.language == "bg" else f"Adjudicated {result} ({reason_text})")
+        elif self.game_board.is_checkmate():
             winner = "Белите" if self.game_board.turn == chess.BLACK and self.language == "bg" else "White" if self.game_board.turn == chess.BLACK else "Черните" if self.language == "bg" else "Black"
             self.play_sound("notify")
             QMessageBox.information(self, "Край на играта" if self.language == "bg" else "Game Over", 
@@ -5854,55 +8693,118 @@ PyChess Pro+ v1.0
                     self.eval_bar.set_score(s)
                     self.last_eval = s
 
+        if "lines" in info:
+            self.update_multipv_lines(info["lines"])
+            return
+        
         # ВАЖНО: Веднаша обновяваме PV линията (Principal Variation) за реално време
         if "pv" in info and len(info["pv"]) > 0:
             pv_moves = info["pv"][:self.pv_moves_display]
-            current_move_number = len(self.current_board.move_stack) // 2 + 1
-            
-            move_list = []
-            temp_board = self.current_board.copy()
-            
-            for move in pv_moves:
-                if move not in temp_board.legal_moves:
-                    break
-                try:
-                    san_move = temp_board.san(move)
-                    move_list.append(san_move)
-                    temp_board.push(move)
-                except Exception:
-                    break
+            # Непроменен PV за същата позиция не се преизчислява
+            pv_key = (self.current_board.fen(), tuple(pv_moves))
+            if pv_key == self.last_pv_key:
+                return
+            self.last_pv_key = pv_key
+            self.pv_line_cache.clear()
             
-            if move_list:
-                formatted_moves = []
-                move_num = current_move_number
-                
-                # Коректно номериране при ход на черните
-                if self.current_board.turn == chess.BLACK:
-                    formatted_moves.append(f"<span style='color: #cccccc'>{move_num}... {move_list[0]}</span>")
-                    move_list = move_list[1:]
-                    move_num += 1
-                
-                i = 0
-                while i < len(move_list):
-                    white_move = move_list[i] if i < len(move_list) else ""
-                    black_move = move_list[i+1] if i+1 < len(move_list) else ""
-                    
-                    if white_move and black_move:
-                        formatted_moves.append(f"<span style='color: #ffffff'>{move_num}. {white_move:10s}</span> <span style='color: #cccccc'>{black_move}</span>")
-                    elif white_move:
-                        formatted_moves.append(f"<span style='color: #ffffff'>{move_num}. {white_move}</span>")
-                    
-                    move_num += 1
-                    i += 2
-                
-                pv_text = "<div style='font-family: Consolas; font-size: 11pt; line-height: 1.5;'>" + " ".join(formatted_moves) + "</div>"
+            pv_html = self.format_pv_html(pv_moves)
+            if pv_html:
+                pv_text = "<div style='font-family: Consolas; font-size: 11pt; line-height: 1.5;'>" + pv_html + "</div>"
                 self.pv_text.setHtml(pv_text)
                 
                 # Показване на стрелка за най-добрия ход в реално време
                 if pv_moves and pv_moves[0] in self.current_board.legal_moves:
                     self.board_w.best_engine_move = pv_moves[0]
+                    self.board_w.engine_arrows = []
                     self.board_w.update()
 
+    def format_pv_html(self, pv_moves):
+        """PV като HTML със SAN нотация и номерация на ходовете"""
+        current_move_number = len(self.current_board.move_stack) // 2 + 1
+        
+        move_list = []
+        temp_board = self.current_board.copy()
+        
+        for move in pv_moves:
+            if move not in temp_board.legal_moves:
+                break
+            try:
+                san_move = temp_board.san(move)
+                move_list.append(san_move)
+                temp_board.push(move)
+            except Exception:
+                break
+        
+        if not move_list:
+            return ""
+        
+        formatted_moves = []
+        move_num = current_move_number
+        
+        # Коректно номериране при ход на черните
+        if self.current_board.turn == chess.BLACK:
+            formatted_moves.append(f"<span style='color: #cccccc'>{move_num}... {move_list[0]}</span>")
+            move_list = move_list[1:]
+            move_num += 1
+        
+        i = 0
+        while i < len(move_list):
+            white_move = move_list[i] if i < len(move_list) else ""
+            black_move = move_list[i+1] if i+1 < len(move_list) else ""
+            
+            if white_move and black_move:
+                formatted_moves.append(f"<span style='color: #ffffff'>{move_num}. {white_move:10s}</span> <span style='color: #cccccc'>{black_move}</span>")
+            elif white_move:
+                formatted_moves.append(f"<span style='color: #ffffff'>{move_num}. {white_move}</span>")
+            
+            move_num += 1
+            i += 2
+        
+        return " ".join(formatted_moves)
+
+    def update_multipv_lines(self, lines):
+        """MultiPV: преизчислява SAN/HTML само за линиите, чийто PV или оценка са се променили"""
+        fen = self.current_board.fen()
+        self.last_pv_key = None
+        changed = False
+        for line, line_info in lines.items():
+            pv_moves = tuple(line_info.get("pv", ())[:self.pv_moves_display])
+            score = line_info.get("score")
+            white_score = score.white() if score is not None else None
+            key = (fen, pv_moves, white_score)
+            cached = self.pv_line_cache.get(line)
+            if cached and cached[0] == key:
+                continue
+            
+            if white_score is None:
+                score_text = ""
+            elif white_score.is_mate():
+                score_text = f"#{white_score.mate()}"
+            else:
+                score_text = f"{white_score.score() / 100:+.2f}"
+            pv_html = self.format_pv_html(list(pv_moves))
+            line_html = f"<div><span style='color: #ffd700'>{line}. [{score_text}]</span> {pv_html}</div>"
+            self.pv_line_cache[line] = (key, line_html, pv_moves[0] if pv_moves else None)
+            changed = True
+        
+        # Линии от предишна позиция или излишни линии се махат
+        for line in [line for line, cached in self.pv_line_cache.items() if line not in lines or cached[0][0] != fen]:
+            del self.pv_line_cache[line]
+            changed = True
+        
+        if not changed:
+            return
+        
+        ordered = [self.pv_line_cache[line] for line in sorted(self.pv_line_cache)]
+        self.pv_text.setHtml("<div style='font-family: Consolas; font-size: 11pt; line-height: 1.5;'>" +
+                             "".join(html for _, html, _ in ordered) + "</div>")
+        
+        candidates = [move for _, _, move in ordered if move and move in self.current_board.legal_moves]
+        if candidates:
+            self.board_w.best_engine_move = candidates[0]
+            self.board_w.engine_arrows = candidates[1:]
+            self.board_w.update()
+
     def tick_clock(self):
         if self.game_board.is_game_over() or self.is_paused:
             return
@@ -5927,6 +8829,7 @@ PyChess Pro+ v1.0
             self.is_paused = True
             self.btn_pause.setText("Продължи" if self.language == "bg" else "Resume")
             self.timer.stop()
+            self.flush_gui()
             if self.engine_thinking:
                 self.stop_engine_thread()
 
@@ -5943,7 +8846,7 @@ PyChess Pro+ v1.0
             self.update_turn_display()
             self.book_move_played = False
             
-            if self.analysis_thread:
+            if self.analysis_token is not None:
                 self.stop_analysis()
             QTimer.singleShot(100, self.start_analysis)
             
@@ -5967,7 +8870,7 @@ PyChess Pro+ v1.0
             self.update_turn_display()
             self.book_move_played = False
             
-            if self.analysis_thread:
+            if self.analysis_token is not None:
                 self.stop_analysis()
             QTimer.singleShot(100, self.start_analysis)
             
@@ -5985,7 +8888,177 @@ PyChess Pro+ v1.0
                               "Функцията за повторение на ход все още не е имплементирана." if self.language == "bg" else "Redo move functionality not yet implemented.")
 
 
+def add_limit_arguments(parser, default_profile):
+    profiles = [key for key, (kwargs, _, _) in SEARCH_PROFILES.items() if kwargs]
+    parser.add_argument("-p", "--profile", choices=profiles, default=default_profile, help="search limit per move")
+    for key in SEARCH_LIMIT_KEYS:
+        parser.add_argument(f"--{key}", type=float if key == "time" else int, help=f"override the profile's {key} limit")
+
+
+def limit_kwargs_from_args(args):
+    """Явните --depth/--nodes/--time/--mate заменят профила"""
+    overrides = {key: getattr(args, key) for key in SEARCH_LIMIT_KEYS if getattr(args, key) is not None}
+    if overrides:
+        return overrides
+    return dict(SEARCH_PROFILES[args.profile][0]) if args.profile else {}
+
+
+def annotate_main(argv):
+    """Конзолен режим: PyChessPro+.py annotate input.pgn -o output.pgn [--workers N]"""
+    settings = Settings()
+    parser = argparse.ArgumentParser(prog="PyChessPro+.py annotate",
+                                     description="Annotate every game of a PGN file with engine evaluations.")
+    parser.add_argument("input", help="input PGN file")
+    parser.add_argument("-o", "--output", help="output PGN file (default: <input>_annotated.pgn)")
+    parser.add_argument("-e", "--engine", help="UCI engine (default: analysis engine or engine 1 from the settings)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes, each with its own single-threaded engine")
+    add_limit_arguments(parser, "nodes_1000000")
+    parser.add_argument("--hash", type=int, default=settings.get("analysis_hash", 64), help="hash per engine (MB)")
+    args = parser.parse_args(argv)
+
+    path = args.engine or settings.get("analysis_engine_path", "") or settings.get("engine1_path", "")
+    if not path or not os.path.exists(path):
+        parser.error("no UCI engine found; pass --engine")
+    limit_kwargs = limit_kwargs_from_args(args)
+    # Мащабираме с броя процеси, а не с нишките на двигателя
+    options = {"SyzygyPath": settings.get("syzygy_path", "")} if settings.get("syzygy_path", "") else {}
+    options.update(settings.engine_options(path))
+    options.update({"Threads": 1, "Hash": args.hash})
+    output = args.output or os.path.splitext(args.input)[0] + "_annotated.pgn"
+
+    started = time.monotonic()
+    annotated = failed = 0
+    with open(args.input, "r", encoding="utf-8", errors="ignore") as source, \
+            open(output, "w", encoding="utf-8") as target, \
+            multiprocessing.Pool(max(1, args.workers), annotator_worker_init, (path, options, limit_kwargs)) as pool:
+        games = (str(game) for game in iter_pgn_games(source))
+        # imap пази реда на партиите; всяка се записва веднага щом е готова
+        for number, (pgn_text, summary, error) in enumerate(pool.imap(annotator_worker_run, games), 1):
+            target.write(pgn_text + "\n\n")
+            target.flush()
+            if error:
+                failed += 1
+                print(f"#{number}: error: {error}", file=sys.stderr)
+                continue
+            annotated += 1
+            accuracy = {name: "-" if data["accuracy"] is None else f"{data['accuracy']}%" for name, data in summary.items()}
+            print(f"#{number}: White {accuracy['white']}  Black {accuracy['black']}  "
+                  f"({annotated / (time.monotonic() - started):.2f} games/s)")
+    print(f"{annotated} games annotated, {failed} failed -> {output}")
+    return 1 if failed and not annotated else 0
+
+
+def unique_engine_name(name, engines):
+    """Името от "id name"; повторенията получават номер"""
+    taken = sum(1 for existing, *_ in engines if existing == name or existing.startswith(name + " #"))
+    return f"{name} #{taken + 1}" if taken else name
+
+
+def tournament_main(argv):
+    """Конзолен режим: PyChessPro+.py tournament engine1 engine2 ... [--format gauntlet] [--tc 60+0.6]"""
+    parser = argparse.ArgumentParser(prog="PyChessPro+.py tournament",
+                                     description="Play an engine tournament without the GUI, many games at a time.")
+    parser.add_argument("engines", nargs="+", help="UCI engine executables (the first one is the gauntlet player)")
+    parser.add_argument("-f", "--format", choices=Tournament.FORMATS, default="round-robin")
+    parser.add_argument("-r", "--rounds", type=int, default=1, help="rounds; every opening is played with both colors")
+    parser.add_argument("--tc", default="60+0.6", help="time control [moves/]seconds[+increment]")
+    add_limit_arguments(parser, None)
+    parser.add_argument("--openings", help="EPD or PGN file with start positions")
+    parser.add_argument("--threads", type=int, default=1, help="threads per engine")
+    parser.add_argument("--hash", type=int, default=16, help="hash per engine (MB)")
+    parser.add_argument("-c", "--concurrency", type=int,
+                        help="games played at once (default: CPU cores / threads; only the side to move thinks)")
+    parser.add_argument("-o", "--pgn", default="tournament.pgn", help="PGN output, appended after every game")
+    parser.add_argument("--results", help="JSON lines with one result per game (default: <pgn>_results.jsonl)")
+    parser.add_argument("--sprt", nargs=2, type=float, metavar=("ELO0", "ELO1"),
+                        help="two engines only: stop as soon as the SPRT accepts one hypothesis")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--resign", nargs=2, type=int, metavar=("CP", "MOVES"),
+                        help="adjudicate a win when both engines score beyond CP for MOVES moves each")
+    parser.add_argument("--draw", nargs=3, type=int, metavar=("CP", "MOVES", "AFTER"),
+                        help="adjudicate a draw when the score stays within CP for MOVES moves after move AFTER")
+    parser.add_argument("--tb-pieces", type=int, default=0, help="adjudicate positions with this many pieces or fewer")
+    parser.add_argument("--syzygy", default="", help="Syzygy tablebase directories (separated by %s)" % os.pathsep)
+    args = parser.parse_args(argv)
+
+    if len(args.engines) < 2:
+        parser.error("at least two engines are needed")
+    if args.sprt and len(args.engines) != 2:
+        parser.error("--sprt needs exactly two engines")
+    for path in args.engines:
+        if not os.path.exists(path):
+            parser.error(f"engine not found: {path}")
+    try:
+        time_control = parse_time_control(args.tc)
+        openings = load_opening_positions(args.openings)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
+    # Имената идват от "id name" на двигателите; повторенията получават номер
+    options = {"Threads": args.threads, "Hash": args.hash}
+    if args.syzygy:
+        options["SyzygyPath"] = args.syzygy
+    engines = []
+    for path in args.engines:
+        engine = chess.engine.SimpleEngine.popen_uci(path)
+        name = engine.id.get("name", os.path.basename(path))
+        engine.quit()
+        engines.append((unique_engine_name(name, engines), path, options))
+
+    statistics = None
+    if len(engines) == 2:
+        elo0, elo1 = args.sprt or (None, None)
+        statistics = MatchStatistics(elo0, elo1, args.alpha, args.beta)
+    adjudication = None
+    if args.resign or args.draw or (args.tb_pieces and args.syzygy):
+        # Правилата без опция са изключени; останалото е по подразбиране от Adjudicator.from_settings
+        adjudication = {"adjudicate_resign_moves": 0, "adjudicate_draw_moves": 0,
+                        "adjudicate_tb_pieces": args.tb_pieces, "syzygy_path": args.syzygy}
+        if args.resign:
+            adjudication["adjudicate_resign_score"], adjudication["adjudicate_resign_moves"] = args.resign
+        if args.draw:
+            (adjudication["adjudicate_draw_score"], adjudication["adjudicate_draw_moves"],
+             adjudication["adjudicate_draw_move_number"]) = args.draw
+    concurrency = args.concurrency or max(1, (os.cpu_count() or 1) // max(1, args.threads))
+    tournament = Tournament(engines, args.format, args.rounds, time_control, limit_kwargs_from_args(args),
+                            openings, concurrency, args.pgn,
+                            args.results or os.path.splitext(args.pgn)[0] + "_results.jsonl",
+                            statistics=statistics, adjudication=adjudication)
+    total = len(tournament.schedule())
+    print(f"{len(engines)} engines, {total} games, {concurrency} at a time")
+
+    print_lock = threading.Lock()
+
+    def report(record):
+        with print_lock:
+            print(f"[{len(tournament.results)}/{total}] {record['white']} - {record['black']}  "
+                  f"{record['result']}  ({record['termination']}, {record['plies']} plies)")
+            if statistics is not None:
+                print("    " + statistics.summary().replace("\n", "\n    "))
+
+    try:
+        standings = tournament.run(report)
+    except KeyboardInterrupt:
+        tournament.stop()
+        standings = tournament.standings()
+    print()
+    print(f"{'Engine':<30} {'Points':>7} {'Games':>6} {'W':>4} {'D':>4} {'L':>4}")
+    for name, points, games, wins, draws, losses in standings:
+        print(f"{name:<30} {points:>7.1f} {games:>6} {wins:>4} {draws:>4} {losses:>4}")
+    if statistics is not None:
+        print()
+        print(f"{engines[0][0]} vs {engines[1][0]}")
+        print(statistics.summary())
+    return 0
+
+
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    commands = {"annotate": annotate_main, "tournament": tournament_main}
+    if len(sys.argv) > 1 and sys.argv[1] in commands:
+        sys.exit(commands[sys.argv[1]](sys.argv[2:]))
     app = QApplication(sys.argv)
     window = App()
     window.show()